@@ -4,8 +4,6 @@
 from flask import Flask
 from app.database import db, db_manager
 from config import Config
-import logging
-from logging.handlers import RotatingFileHandler
 
 
 def create_app(config_class=Config):
@@ -13,44 +11,65 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
-    # Set up logging
+    config_class.DATA_DIR.mkdir(exist_ok=True)
+
+    # Set up logging; records are written by a background thread
     if not app.debug:
         # Create logs directory if it doesn't exist
-        log_dir = Config.DATA_DIR / "logs"
+        log_dir = config_class.DATA_DIR / "logs"
         log_dir.mkdir(exist_ok=True)
 
-        # Set up file handler
-        file_handler = RotatingFileHandler(
-            log_dir / "catalog_manager.log", maxBytes=10240000, backupCount=10  # 10MB
-        )
-        file_handler.setFormatter(
-            logging.Formatter(
-                "%(asctime)s %(levelname)s: %(message)s " "[in %(pathname)s:%(lineno)d]"
-            )
-        )
-        file_handler.setLevel(logging.INFO)
-        app.logger.addHandler(file_handler)
-
-        app.logger.setLevel(logging.INFO)
+        from app import structured_logging
+
+        structured_logging.init_app(app, log_dir)
         app.logger.info("Catalog Manager startup")
 
-    # Initialize databases
+    # Initialize databases; db_manager shares the engine created by db
     db.init_app(app)
     db_manager.init_app(app)
 
+    # Optional read snapshot; loaded on first use
+    from app.snapshot import catalog_snapshot
+
+    catalog_snapshot.init_app(app)
+
+    # Optional pre-rendered download files; rendered on first use
+    from app.static_catalog import static_catalog
+
+    static_catalog.init_app(app)
+
+    # Typeahead prefix index; built on first use
+    from app.suggest import suggestion_index
+
+    suggestion_index.init_app(app)
+
+    # Background jobs; the worker pool starts on first submit
+    from app.jobs import job_manager
+
+    job_manager.init_app(app)
+
+    # Concurrency limits and load shedding for API requests
+    from app.admission import admission_controller
+
+    admission_controller.init_app(app)
+
     # Register blueprints
     from app.routes import bp
 
     app.register_blueprint(bp)
 
-    # Ensure the database exists
+    # Bring the schema up to date; a no-op on an already migrated database
     with app.app_context():
-        app.logger.info(f"Database path: {Config.SQLITE_DB_PATH}")
+        app.logger.info("Database URI: %s", app.config["SQLALCHEMY_DATABASE_URI"])
         try:
-            db.create_all()
-            app.logger.info("Database tables created successfully")
+            applied = db_manager.migrate()
+            if applied:
+                app.logger.info("Applied schema migrations: %s", applied)
+            orphaned = job_manager.recover()
+            if orphaned:
+                app.logger.warning("Marked %s interrupted job(s) as failed", orphaned)
         except Exception as e:
-            app.logger.error(f"Error creating database tables: {str(e)}")
+            app.logger.error("Error migrating database schema: %s", e)
             raise
 
     return app
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+import math
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from flask import Flask, g, jsonify, request
+import logging
+
+logger = logging.getLogger(__name__)
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# POST endpoints that only read, admitted against the read budget
+READ_ONLY_ENDPOINTS = {"main.batch_get_entities"}
+
+
+class _Budget:
+    """Concurrency limit with a bounded wait queue"""
+
+    def __init__(self, limit: int, max_queue: int, queue_timeout: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        self.peak_waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if needed; False means shed"""
+        with self._cond:
+            if self.active < self.limit and self.waiting == 0:
+                self.active += 1
+                self.admitted += 1
+                return True
+            if self.waiting >= self.max_queue:
+                self.shed += 1
+                return False
+
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while self.active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.shed += 1
+                        return False
+                    self._cond.wait(remaining)
+                self.active += 1
+                self.admitted += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self) -> None:
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def metrics(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "active": self.active,
+                "queue_depth": self.waiting,
+                "queue_limit": self.max_queue,
+                "peak_queue_depth": self.peak_waiting,
+                "admitted": self.admitted,
+                "shed": self.shed,
+            }
+
+
+class _TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class AdmissionController:
+    """Bounds concurrent API requests and rate-limits clients
+
+    Reads and writes have separate concurrency budgets, each with a bounded
+    wait queue. Requests that find the queue full, or wait longer than the
+    queue timeout, are shed with 503 and Retry-After. Each client, identified
+    by X-Client-Id or its address, also has a token bucket; exceeding it
+    returns 429. Limits apply per process.
+    """
+
+    def __init__(self, app: Flask = None):
+        self.enabled = False
+        self.read: Optional[_Budget] = None
+        self.write: Optional[_Budget] = None
+        self.client_rate = 0.0
+        self.client_burst = 0.0
+        self.retry_after = 1
+        self.rate_limited = 0
+        self._buckets: Dict[str, _TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """Register request hooks when ADMISSION_CONTROL is enabled"""
+        self.enabled = app.config.get("ADMISSION_CONTROL", False)
+        if not self.enabled:
+            return
+
+        timeout = app.config["ADMISSION_QUEUE_TIMEOUT"]
+        self.read = _Budget(
+            app.config["ADMISSION_READ_LIMIT"],
+            app.config["ADMISSION_READ_QUEUE"],
+            timeout,
+        )
+        self.write = _Budget(
+            app.config["ADMISSION_WRITE_LIMIT"],
+            app.config["ADMISSION_WRITE_QUEUE"],
+            timeout,
+        )
+        self.client_rate = app.config["ADMISSION_CLIENT_RATE"]
+        self.client_burst = app.config["ADMISSION_CLIENT_BURST"]
+        self.retry_after = app.config["ADMISSION_RETRY_AFTER"]
+
+        app.before_request(self._admit)
+        app.teardown_request(self._release)
+
+    def _take_token(self, client: str) -> Tuple[bool, float]:
+        """Take a token from the client's bucket; returns (allowed, retry_after)"""
+        now = time.monotonic()
+        with self._buckets_lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                if len(self._buckets) >= 10000:
+                    self._prune(now)
+                bucket = self._buckets[client] = _TokenBucket(self.client_burst, now)
+            bucket.tokens = min(
+                self.client_burst,
+                bucket.tokens + (now - bucket.updated) * self.client_rate,
+            )
+            bucket.updated = now
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return True, 0.0
+            self.rate_limited += 1
+            return False, (1 - bucket.tokens) / self.client_rate
+
+    def _prune(self, now: float) -> None:
+        """Forget clients whose buckets have refilled; they are idle"""
+        refill = self.client_burst / self.client_rate
+        self._buckets = {
+            client: bucket
+            for client, bucket in self._buckets.items()
+            if now - bucket.updated < refill
+        }
+
+    def _admit(self) -> Optional[Tuple[Any, int, Dict[str, str]]]:
+        path = request.path
+        if not path.startswith("/api/") or path.startswith("/api/metrics"):
+            return None
+
+        if self.client_rate > 0:
+            client = (
+                request.headers.get("X-Client-Id") or request.remote_addr or "unknown"
+            )
+            allowed, retry_after = self._take_token(client)
+            if not allowed:
+                return (
+                    jsonify(
+                        {
+                            "status": "error",
+                            "type": "rate_limited",
+                            "message": "Too many requests from this client",
+                        }
+                    ),
+                    429,
+                    {"Retry-After": str(math.ceil(retry_after))},
+                )
+
+        is_write = (
+            request.method in WRITE_METHODS
+            and request.endpoint not in READ_ONLY_ENDPOINTS
+        )
+        budget = self.write if is_write else self.read
+        if not budget.acquire():
+            logger.warning(
+                "Shedding %s %s: server overloaded", request.method, request.path
+            )
+            return (
+                jsonify(
+                    {
+                        "status": "error",
+                        "type": "overloaded",
+                        "message": "Server is overloaded, retry later",
+                    }
+                ),
+                503,
+                {"Retry-After": str(self.retry_after)},
+            )
+        g.admission_budget = budget
+        return None
+
+    def _release(self, exception=None) -> None:
+        budget = g.pop("admission_budget", None)
+        if budget is not None:
+            budget.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Current budget usage, queue depths and shed counts"""
+        if not self.enabled:
+            return {"enabled": False}
+        with self._buckets_lock:
+            clients = len(self._buckets)
+        return {
+            "enabled": True,
+            "read": self.read.metrics(),
+            "write": self.write.metrics(),
+            "rate_limited": self.rate_limited,
+            "tracked_clients": clients,
+        }
+
+
+# Create admission controller instance
+admission_controller = AdmissionController()
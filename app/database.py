@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 
-from typing import Generator
+from typing import Any, Callable, Dict, Generator, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from contextvars import copy_context
+from pathlib import Path
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import create_engine, event, Engine
+from sqlalchemy import create_engine, delete, event, select, text, Engine
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import (
     DeclarativeBase,
     MappedAsDataclass,
@@ -12,11 +16,43 @@ from sqlalchemy.orm import (
     sessionmaker,
     scoped_session,
 )
-from sqlalchemy.pool import QueuePool
+from app.sharding import ShardMap, ID_STRIDE
 import logging
+import sqlite3
+import time
 
 logger = logging.getLogger(__name__)
 
+# Tables whose rows belong to a catalog entity through an entity_id column
+# and move with it between shards
+ENTITY_CHILD_TABLES = ("entity_revisions",)
+
+# Attempts, WAL_SWITCH_DELAY seconds apart, to switch a database to WAL mode
+WAL_SWITCH_ATTEMPTS = 40
+WAL_SWITCH_DELAY = 0.05
+
+# Times an entity that keeps being written to is re-copied during a move
+# before it is left for the next startup to finish
+MOVE_ATTEMPTS = 5
+
+
+def _enable_wal(cursor) -> None:
+    """Switch a connection's database to WAL mode
+
+    The mode is stored in the file, so this is normally a no-op. Switching
+    a new file takes an exclusive lock, and SQLite reports "database is
+    locked" at once, without waiting out the busy timeout, while other
+    workers are opening the same file; so the switch is retried briefly.
+    """
+    for attempt in range(WAL_SWITCH_ATTEMPTS):
+        try:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            return
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) or attempt == WAL_SWITCH_ATTEMPTS - 1:
+                raise
+            time.sleep(WAL_SWITCH_DELAY)
+
 
 class Base(DeclarativeBase, MappedAsDataclass):
     """Base class for all SQLAlchemy models"""
@@ -32,28 +68,25 @@ class DatabaseManager:
         self._engine: Engine | None = None
         self._session_factory: sessionmaker | None = None
         self._scoped_session: scoped_session | None = None
+        self.shard_map: ShardMap | None = None
+        self._shard_engines: Dict[str, Engine] = {}
+        self._shard_sessions: Dict[str, sessionmaker] = {}
+        self._executor: ThreadPoolExecutor | None = None
 
         if app is not None:
             self.init_app(app)
 
     def init_app(self, app: Flask) -> None:
-        """Initialize the database with the Flask app"""
+        """Initialize the database with the Flask app
+
+        Must be called after db.init_app(app), whose engine is reused.
+        """
         self.app = app
 
-        # Create engine with specific configuration
-        # TODO: Update this to use values from config.py
-        self._engine = create_engine(
-            app.config["SQLALCHEMY_DATABASE_URI"],
-            poolclass=QueuePool,
-            pool_size=10,
-            max_overflow=20,
-            pool_timeout=30,
-            pool_pre_ping=True,
-            pool_recycle=3600,
-            echo=app.debug,
-            echo_pool=app.debug,
-            logging_name="sqlalchemy.engine",
-        )
+        # Share the Flask-SQLAlchemy engine so the app holds a single pool;
+        # pool options come from SQLALCHEMY_ENGINE_OPTIONS in config.py
+        with app.app_context():
+            self._engine = db.engine
 
         # Set up session factory
         self._session_factory = sessionmaker(
@@ -65,18 +98,55 @@ class DatabaseManager:
 
         # Set up SQLite specific pragma statements
         if "sqlite" in app.config["SQLALCHEMY_DATABASE_URI"]:
-            self._setup_sqlite_engine()
+            self._setup_sqlite_engine(self._engine)
+
+        # Optional namespace sharding across several SQLite files
+        if app.config.get("CATALOG_SHARDS"):
+            self._init_shards(app)
 
         # Register teardown context
         app.teardown_appcontext(self._teardown)
 
-    def _setup_sqlite_engine(self) -> None:
+    def _init_shards(self, app: Flask) -> None:
+        """Open one engine per shard, loading or creating the shard map"""
+        shard_dir = Path(app.config["SHARD_DIR"])
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        map_path = shard_dir / "shard_map.json"
+
+        if map_path.exists():
+            self.shard_map = ShardMap.load(map_path)
+            if len(self.shard_map.shards) != app.config["CATALOG_SHARDS"]:
+                logger.warning(
+                    "CATALOG_SHARDS=%s but the shard map has %s shards; "
+                    "run utils/rebalance_shards.py to reshard",
+                    app.config["CATALOG_SHARDS"],
+                    len(self.shard_map.shards),
+                )
+        else:
+            self.shard_map = ShardMap.with_shard_count(app.config["CATALOG_SHARDS"])
+            self.shard_map.save(map_path)
+
+        for shard in self.shard_map.shards:
+            engine = create_engine(
+                f"sqlite:///{shard_dir / f'{shard}.db'}",
+                **app.config["SQLALCHEMY_ENGINE_OPTIONS"],
+            )
+            self._setup_sqlite_engine(engine)
+            self._shard_engines[shard] = engine
+            self._shard_sessions[shard] = sessionmaker(
+                bind=engine, expire_on_commit=False, autoflush=False
+            )
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(self.shard_map.shards), thread_name_prefix="shard"
+        )
+
+    def _setup_sqlite_engine(self, engine: Engine) -> None:
         """Configure SQLite specific settings"""
 
-        @event.listens_for(self._engine, "connect")
+        @event.listens_for(engine, "connect")
         def set_sqlite_pragma(dbapi_connection, connection_record):
             cursor = dbapi_connection.cursor()
-            cursor.execute("PRAGMA journal_mode=WAL")  # Write-Ahead Logging
+            _enable_wal(cursor)  # Write-Ahead Logging
             cursor.execute(
                 "PRAGMA synchronous=NORMAL"
             )  # Faster writes with some safety
@@ -104,30 +174,313 @@ class DatabaseManager:
             raise RuntimeError("DatabaseManager is not initialized with an application")
         return self._engine
 
+    @property
+    def sharded(self) -> bool:
+        """Whether entities are stored across namespace shards"""
+        return self.shard_map is not None
+
+    @property
+    def shards(self) -> List[Optional[str]]:
+        """Names of all shards; [None] (the main database) when not sharded"""
+        return list(self.shard_map.shards) if self.sharded else [None]
+
     @contextmanager
-    def session_scope(self) -> Generator[Session, None, None]:
+    def session_scope(
+        self, shard: Optional[str] = None
+    ) -> Generator[Session, None, None]:
         """Context manager for database sessions
 
+        With sharding enabled, pass the shard to open a session on; the
+        default is the main database.
+
         Usage:
             with db_manager.session_scope() as session:
                 session.add(some_object)
                 session.commit()
         """
-        session = self._session_factory()
+        factory = (
+            self._session_factory if shard is None else self._shard_sessions[shard]
+        )
+        session = factory()
         try:
             yield session
             session.commit()
         except Exception as e:
-            logger.error(f"Error in session: {str(e)}")
+            logger.error("Error in session: %s", e)
             session.rollback()
             raise
         finally:
             session.close()
 
+    def shard_for(self, namespace: str) -> Optional[str]:
+        """Return the shard storing namespace, or None when not sharded"""
+        return self.shard_map.shard_for(namespace) if self.sharded else None
+
+    def locate_entity(self, entity_id: int) -> Optional[str]:
+        """Return the shard holding an entity id, or None when not sharded
+
+        The shard the id was allocated on is probed first; entities whose
+        namespace has been rebalanced are found by probing the rest.
+        """
+        if not self.sharded:
+            return None
+        home = self.shard_map.home_shard(entity_id)
+        candidates = [home] if home else []
+        candidates += [shard for shard in self.shard_map.shards if shard != home]
+        query = text("SELECT 1 FROM catalog_entities WHERE id = :id")
+        for shard in candidates:
+            with self._shard_engines[shard].connect() as conn:
+                if conn.execute(query, {"id": entity_id}).first():
+                    return shard
+        return home or self.shard_map.shards[0]
+
+    def fan_out(self, fn: Callable[[Session], Any]) -> List[Any]:
+        """Run fn with a session on every shard in parallel, in shard order"""
+        if not self.sharded:
+            with self.session_scope() as session:
+                return [fn(session)]
+
+        def run(shard: str) -> Any:
+            with self.session_scope(shard) as session:
+                return fn(session)
+
+        # Each task runs in a copy of the caller's context so per-request
+        # state such as SQL statement counting follows it to the pool thread
+        futures = [
+            self._executor.submit(copy_context().run, run, shard)
+            for shard in self.shard_map.shards
+        ]
+        return [future.result() for future in futures]
+
+    def next_entity_id(self, session: Session, shard: Optional[str]) -> Optional[int]:
+        """Allocate a globally unique entity id on a shard
+
+        Returns None when not sharded, leaving the id to autoincrement.
+        """
+        if shard is None:
+            return None
+        session.execute(text("UPDATE shard_sequence SET value = value + 1"))
+        value = session.execute(text("SELECT value FROM shard_sequence")).scalar_one()
+        return value * ID_STRIDE + self.shard_map.index_of(shard)
+
+    def move_rows(self, source: Optional[str], target: str, *criteria) -> int:
+        """Move matching entities from source to target shard
+
+        Rows in ENTITY_CHILD_TABLES belonging to those entities move with
+        them. A source of None is the main database. Each copy is recorded
+        in the target's shard_moves journal, and an entity is deleted from
+        the source only while its updated_at and content_hash still match
+        what was copied; entities written to in between are copied again.
+        A move interrupted at any point is finished by finish_moves().
+        Returns the number of entities moved.
+        """
+        table = Base.metadata.tables["catalog_entities"]
+        source_engine = self.engine if source is None else self._shard_engines[source]
+        target_engine = self._shard_engines[target]
+        copied: Dict[int, tuple] = {}
+        moved = 0
+        changed: List[int] = []
+        for _ in range(MOVE_ATTEMPTS):
+            rows, children = self._read_entities(source_engine, criteria)
+            if changed:
+                # Deleted on the source after being copied; drop the copy
+                gone = set(changed) - {row["id"] for row in rows}
+                self._discard_copies(target_engine, {i: copied[i] for i in gone})
+            if not rows:
+                break
+
+            if source is None:
+                # Ids imported from the main database do not follow the shard
+                # scheme, so keep every shard's future ids clear of them
+                floor = max(row["id"] for row in rows) // ID_STRIDE + 1
+                for engine in self._shard_engines.values():
+                    with engine.begin() as conn:
+                        conn.execute(
+                            text(
+                                "UPDATE shard_sequence SET value = MAX(value, :floor)"
+                            ),
+                            {"floor": floor},
+                        )
+
+            with target_engine.begin() as conn:
+                insert = sqlite_insert(table)
+                conn.execute(
+                    insert.on_conflict_do_update(
+                        index_elements=[table.c.id],
+                        set_={
+                            column.name: insert.excluded[column.name]
+                            for column in table.c
+                            if column.name != "id"
+                        },
+                        # Never replace a copy that has been written to since
+                        where=table.c.updated_at <= insert.excluded.updated_at,
+                    ),
+                    rows,
+                )
+                for name, child in self._child_tables():
+                    if children[name]:
+                        conn.execute(
+                            sqlite_insert(child).on_conflict_do_nothing(),
+                            children[name],
+                        )
+                conn.execute(
+                    text(
+                        "INSERT OR REPLACE INTO shard_moves (entity_id, source) "
+                        "VALUES (:id, :source)"
+                    ),
+                    [{"id": row["id"], "source": source} for row in rows],
+                )
+            for row in rows:
+                copied[row["id"]] = (row["updated_at"], row["content_hash"])
+
+            removed = self._delete_unchanged(source_engine, rows)
+            self._clear_journal(target_engine, removed)
+            moved += len(removed)
+            changed = [row["id"] for row in rows if row["id"] not in removed]
+            if not changed:
+                break
+            criteria = (table.c.id.in_(changed),)
+        else:
+            logger.warning(
+                "Entities %s kept changing while moving from %s to %s; "
+                "the move will be finished on the next startup",
+                changed,
+                source or "main",
+                target,
+            )
+        return moved
+
+    def finish_moves(self) -> int:
+        """Finish entity moves interrupted before the source copy was deleted
+
+        Returns the number of entities moved.
+        """
+        moved = 0
+        for target, engine in self._shard_engines.items():
+            with engine.connect() as conn:
+                pending = conn.execute(
+                    text("SELECT entity_id, source FROM shard_moves")
+                ).all()
+            sources: Dict[Optional[str], List[int]] = {}
+            for entity_id, source in pending:
+                sources.setdefault(source, []).append(entity_id)
+            table = Base.metadata.tables["catalog_entities"]
+            for source, ids in sources.items():
+                if source is not None and source not in self._shard_engines:
+                    logger.warning(
+                        "Shard %s recorded moves from unknown shard %s", target, source
+                    )
+                    continue
+                moved += self.move_rows(source, target, table.c.id.in_(ids))
+                # Entities no longer on the source finished moving before
+                # the journal was cleared
+                self._clear_journal(engine, ids)
+        if moved:
+            logger.info("Finished %s interrupted entity moves", moved)
+        return moved
+
+    def _read_entities(self, engine: Engine, criteria) -> tuple:
+        """Return matching entity rows and their child rows by table name"""
+        table = Base.metadata.tables["catalog_entities"]
+        with engine.connect() as conn:
+            rows = [
+                dict(row)
+                for row in conn.execute(select(table).where(*criteria)).mappings()
+            ]
+            ids = [row["id"] for row in rows]
+            # Child rows get new surrogate ids on the target shard
+            children = {
+                name: [
+                    {key: value for key, value in row.items() if key != "id"}
+                    for row in conn.execute(
+                        select(child).where(child.c.entity_id.in_(ids))
+                    ).mappings()
+                ]
+                for name, child in self._child_tables()
+            }
+        return rows, children
+
+    def _delete_unchanged(self, engine: Engine, rows: List[dict]) -> set:
+        """Delete entities still matching rows; return the ids deleted"""
+        table = Base.metadata.tables["catalog_entities"]
+        removed = set()
+        with engine.begin() as conn:
+            for row in rows:
+                result = conn.execute(
+                    delete(table).where(
+                        table.c.id == row["id"],
+                        table.c.updated_at.is_not_distinct_from(row["updated_at"]),
+                        table.c.content_hash.is_not_distinct_from(row["content_hash"]),
+                    )
+                )
+                if result.rowcount:
+                    removed.add(row["id"])
+            for _, child in self._child_tables():
+                conn.execute(delete(child).where(child.c.entity_id.in_(removed)))
+        return removed
+
+    def _discard_copies(self, engine: Engine, versions: Dict[int, tuple]) -> None:
+        """Delete copies that are still at the given (updated_at, content_hash)"""
+        if not versions:
+            return
+        discarded = self._delete_unchanged(
+            engine,
+            [
+                {
+                    "id": entity_id,
+                    "updated_at": updated_at,
+                    "content_hash": content_hash,
+                }
+                for entity_id, (updated_at, content_hash) in versions.items()
+            ],
+        )
+        self._clear_journal(engine, versions)
+        if discarded:
+            logger.info("Dropped copies of entities deleted mid-move: %s", discarded)
+
+    @staticmethod
+    def _clear_journal(engine: Engine, ids) -> None:
+        if not ids:
+            return
+        with engine.begin() as conn:
+            conn.execute(
+                text("DELETE FROM shard_moves WHERE entity_id = :id"),
+                [{"id": entity_id} for entity_id in ids],
+            )
+
+    @staticmethod
+    def _child_tables():
+        return [(name, Base.metadata.tables[name]) for name in ENTITY_CHILD_TABLES]
+
+    def database_files(self) -> Dict[str, Path]:
+        """SQLite database files by label: 'main' plus one per shard"""
+        engines = [("main", self._engine), *self._shard_engines.items()]
+        return {
+            label: Path(engine.url.database)
+            for label, engine in engines
+            if engine.url.get_backend_name() == "sqlite" and engine.url.database
+        }
+
     def create_all(self) -> None:
         """Create all database tables"""
         Base.metadata.create_all(self._engine)
 
+    def migrate(self) -> list:
+        """Apply pending schema migrations and return the versions applied"""
+        from app.migrations import (
+            run_migrations,
+            ensure_move_journal,
+            ensure_shard_sequence,
+        )
+
+        applied = run_migrations(self.engine)
+        for shard, engine in self._shard_engines.items():
+            run_migrations(engine)
+            ensure_shard_sequence(engine)
+            ensure_move_journal(engine)
+        self.finish_moves()
+        return applied
+
     def drop_all(self) -> None:
         """Drop all database tables"""
         Base.metadata.drop_all(self._engine)
@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+import yaml
+from flask import Flask, current_app
+from sqlalchemy import func, select, tuple_, update
+from app.database import db_manager
+from app.models import (
+    BackgroundJob,
+    CatalogEntity,
+    compute_content_hash,
+    entity_columns,
+)
+from app.revisions import record_revision
+from app.schema import validate_columns, validate_entity
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Job states; the last three are final
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = (
+    "queued",
+    "running",
+    "succeeded",
+    "failed",
+    "cancelled",
+)
+FINAL_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# Entities read or written per transaction by export and import jobs
+BATCH_SIZE = 500
+
+# Export files kept in DATA_DIR/exports
+KEEP_EXPORTS = 5
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation has been requested"""
+
+
+class JobQueueFull(Exception):
+    """Raised by submit() when the pool and its queue are at capacity"""
+
+
+class JobType(NamedTuple):
+    run: Callable[["JobContext"], Any]
+    # Validates parameters at submit time and returns the ones to store
+    prepare: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+
+
+JOB_TYPES: Dict[str, JobType] = {}
+
+
+def job_type(name: str, prepare=None):
+    """Register a job function under a type name"""
+
+    def register(run):
+        JOB_TYPES[name] = JobType(run, prepare)
+        return run
+
+    return register
+
+
+class JobContext:
+    """Handed to a running job for progress reporting and cancellation checks
+
+    Progress is kept in memory and written to the job record at most every
+    JOB_PROGRESS_INTERVAL seconds; each write also picks up a cancellation
+    requested by another process.
+    """
+
+    def __init__(self, job_id: int, params: Dict[str, Any], flush_interval: float):
+        self.job_id = job_id
+        self.params = params
+        self.progress = 0.0
+        self.message: Optional[str] = None
+        self.cancel_event = threading.Event()
+        self._flush_interval = flush_interval
+        self._last_flush = 0.0
+
+    def update(self, progress: float, message: Optional[str] = None) -> None:
+        """Report the fraction of work done (0-1) and optionally the current step"""
+        self.progress = min(max(progress, 0.0), 1.0)
+        if message is not None:
+            self.message = message
+        if time.monotonic() - self._last_flush >= self._flush_interval:
+            self.flush()
+        self.check_cancelled()
+
+    def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        with db_manager.session_scope() as session:
+            cancel_requested = session.execute(
+                update(BackgroundJob)
+                .where(BackgroundJob.id == self.job_id)
+                .values(progress=self.progress, message=self.message)
+                .returning(BackgroundJob.cancel_requested)
+            ).scalar()
+        if cancel_requested:
+            self.cancel_event.set()
+
+    def check_cancelled(self) -> None:
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+
+class JobManager:
+    """Runs long operations on a bounded thread pool with persistent records
+
+    Jobs are recorded in the background_jobs table of the main database, so
+    their status survives the process and is visible to every worker. Each
+    process runs the jobs submitted to it; a job left queued or running by
+    a process that has since exited is marked failed at startup.
+    """
+
+    def __init__(self, app: Flask = None):
+        self.app: Optional[Flask] = None
+        self.workers = 2
+        self.queue_limit = 16
+        self.progress_interval = 1.0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._active: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """Read job settings; the pool is started on first submit"""
+        self.app = app
+        self.workers = app.config.get("JOB_WORKERS", 2)
+        self.queue_limit = app.config.get("JOB_QUEUE_LIMIT", 16)
+        self.progress_interval = app.config.get("JOB_PROGRESS_INTERVAL", 1.0)
+
+    @staticmethod
+    def _worker_id() -> str:
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="job"
+            )
+        return self._executor
+
+    def submit(self, name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Record a job and queue it; raises ValueError or JobQueueFull"""
+        if name not in JOB_TYPES:
+            raise ValueError(
+                f"Unknown job type '{name}'; expected one of: {', '.join(JOB_TYPES)}"
+            )
+        with self._lock:
+            if len(self._active) >= self.queue_limit:
+                raise JobQueueFull()
+            prepare = JOB_TYPES[name].prepare
+            if prepare is not None:
+                params = prepare(params)
+
+            with db_manager.session_scope() as session:
+                job = BackgroundJob(
+                    job_type=name, params=json.dumps(params), worker=self._worker_id()
+                )
+                session.add(job)
+                session.flush()
+                job_dict = job.to_dict()
+
+            context = JobContext(job_dict["id"], params, self.progress_interval)
+            future = self._pool().submit(self._run, context)
+            self._active[context.job_id] = (future, context)
+        return job_dict
+
+    def _set(self, job_id: int, **values) -> None:
+        with db_manager.session_scope() as session:
+            session.execute(
+                update(BackgroundJob).where(BackgroundJob.id == job_id).values(**values)
+            )
+
+    def _run(self, context: JobContext) -> None:
+        with self.app.app_context():
+            try:
+                with db_manager.session_scope() as session:
+                    job = session.get(BackgroundJob, context.job_id)
+                    if job.cancel_requested:
+                        job.status = CANCELLED
+                        job.finished_at = datetime.utcnow()
+                        return
+                    job.status = RUNNING
+                    job.started_at = datetime.utcnow()
+                    name = job.job_type
+
+                logger.info("Job %s (%s) started", context.job_id, name)
+                try:
+                    result = JOB_TYPES[name].run(context)
+                except JobCancelled:
+                    logger.info("Job %s cancelled", context.job_id)
+                    self._set(
+                        context.job_id,
+                        status=CANCELLED,
+                        progress=context.progress,
+                        message=context.message,
+                        finished_at=datetime.utcnow(),
+                    )
+                except Exception as e:
+                    logger.error("Job %s failed: %s", context.job_id, e, exc_info=True)
+                    self._set(
+                        context.job_id,
+                        status=FAILED,
+                        progress=context.progress,
+                        message=context.message,
+                        error=str(e),
+                        finished_at=datetime.utcnow(),
+                    )
+                else:
+                    logger.info("Job %s succeeded", context.job_id)
+                    self._set(
+                        context.job_id,
+                        status=SUCCEEDED,
+                        progress=1.0,
+                        message=context.message,
+                        result=json.dumps(result, default=str),
+                        finished_at=datetime.utcnow(),
+                    )
+            except Exception as e:
+                logger.error("Could not record job %s: %s", context.job_id, e)
+            finally:
+                with self._lock:
+                    self._active.pop(context.job_id, None)
+
+    def _with_live_progress(self, job: BackgroundJob) -> Dict[str, Any]:
+        job_dict = job.to_dict()
+        active = self._active.get(job.id)
+        if active is not None and job.status == RUNNING:
+            # This process runs the job; its in-memory progress is fresher
+            progress = active[1].progress
+            elapsed = job_dict["elapsed_seconds"]
+            eta = elapsed * (1 - progress) / progress if 0 < progress < 1 else None
+            job_dict.update(
+                progress=round(progress, 4),
+                message=active[1].message,
+                eta_seconds=round(eta, 1) if eta is not None else None,
+            )
+        return job_dict
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with db_manager.session_scope() as session:
+            job = session.get(BackgroundJob, job_id)
+            return self._with_live_progress(job) if job is not None else None
+
+    def list(self, status: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """Return the most recent jobs, newest first"""
+        stmt = select(BackgroundJob).order_by(BackgroundJob.id.desc()).limit(limit)
+        if status is not None:
+            stmt = stmt.where(BackgroundJob.status == status)
+        with db_manager.session_scope() as session:
+            jobs = session.execute(stmt).scalars().all()
+            return [self._with_live_progress(job) for job in jobs]
+
+    def cancel(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Request cancellation; queued jobs stop at once, running ones at
+        their next progress report. Returns the job, or None if unknown."""
+        with db_manager.session_scope() as session:
+            job = session.get(BackgroundJob, job_id)
+            if job is None:
+                return None
+            if job.status in FINAL_STATES:
+                return job.to_dict()
+            job.cancel_requested = True
+            active = self._active.get(job_id)
+            if active is not None:
+                future, context = active
+                context.cancel_event.set()
+                if future.cancel():
+                    # Never started; _run will not record anything
+                    with self._lock:
+                        self._active.pop(job_id, None)
+                    job.status = CANCELLED
+                    job.finished_at = datetime.utcnow()
+            return job.to_dict()
+
+    def recover(self) -> int:
+        """Mark jobs orphaned by a dead process on this host as failed"""
+        host = socket.gethostname()
+        stmt = select(BackgroundJob).where(
+            BackgroundJob.status.in_((QUEUED, RUNNING)),
+            BackgroundJob.worker.like(f"{host}:%"),
+        )
+        orphaned = 0
+        with db_manager.session_scope() as session:
+            for job in session.execute(stmt).scalars():
+                pid = int(job.worker.rpartition(":")[2])
+                if pid != os.getpid() and _pid_alive(pid):
+                    continue
+                if pid == os.getpid() and job.id in self._active:
+                    continue
+                job.status = FAILED
+                job.error = "Interrupted: the process running this job exited"
+                job.finished_at = datetime.utcnow()
+                orphaned += 1
+        return orphaned
+
+    def artifact(self, job_id: int) -> Optional[Path]:
+        """Return the file produced by a finished export job, if it still exists"""
+        job = self.get(job_id)
+        if job is None or job["status"] != SUCCEEDED or not job["result"]:
+            return None
+        path = job["result"].get("path")
+        if path is None or not Path(path).is_file():
+            return None
+        return Path(path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@job_type("backup")
+def run_backup(context: JobContext) -> Dict[str, Any]:
+    """Back up every database file with SQLite's online backup API"""
+    from utils.backup import backup_database
+
+    files = db_manager.database_files()
+    backup_dir = Path(current_app.config["DATA_DIR"]) / "backups"
+    backups = {}
+    for index, (label, path) in enumerate(files.items()):
+
+        def progress(copied, total, index=index, label=label):
+            done = copied / total if total else 1.0
+            context.update((index + done) / len(files), f"Backing up {label}")
+
+        backups[label] = str(backup_database(path, backup_dir, progress=progress))
+    return {"backups": backups}
+
+
+@job_type("maintenance")
+def run_database_maintenance(context: JobContext) -> Dict[str, Any]:
+    """VACUUM, ANALYZE and optimize every database file"""
+    from utils.maintenance import run_maintenance
+
+    files = db_manager.database_files()
+    for index, (label, path) in enumerate(files.items()):
+        context.update(index / len(files), f"Optimizing {label}")
+
+        def progress(step, steps, index=index):
+            context.update((index + step / steps) / len(files))
+
+        run_maintenance(path, progress=progress)
+    return {"databases": list(files)}
+
+
+def _prepare_export(params: Dict[str, Any]) -> Dict[str, Any]:
+    export_format = params.get("format", "yaml")
+    if export_format not in ("yaml", "json"):
+        raise ValueError("format must be 'yaml' or 'json'")
+    return {"format": export_format}
+
+
+@job_type("export", prepare=_prepare_export)
+def run_export(context: JobContext) -> Dict[str, Any]:
+    """Write the whole catalog to one file in DATA_DIR/exports"""
+    export_format = context.params["format"]
+    export_dir = Path(current_app.config["DATA_DIR"]) / "exports"
+    export_dir.mkdir(exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = export_dir / f"catalog_{timestamp}_{context.job_id}.{export_format}"
+    partial = path.with_suffix(path.suffix + ".part")
+
+    count_stmt = select(func.count()).select_from(CatalogEntity)
+    total = sum(db_manager.fan_out(lambda s: s.execute(count_stmt).scalar_one()))
+    exported = 0
+    try:
+        with open(partial, "w", encoding="utf-8") as out:
+            if export_format == "json":
+                out.write("[")
+            for shard in db_manager.shards:
+                last_id = 0
+                while True:
+                    stmt = (
+                        select(CatalogEntity.id, CatalogEntity.entity_data)
+                        .where(CatalogEntity.id > last_id)
+                        .order_by(CatalogEntity.id)
+                        .limit(BATCH_SIZE)
+                    )
+                    with db_manager.session_scope(shard) as session:
+                        rows = session.execute(stmt).all()
+                    if not rows:
+                        break
+                    for entity_id, entity_data in rows:
+                        # Stored documents are already YAML; only JSON re-encodes
+                        if export_format == "json":
+                            if exported:
+                                out.write(",")
+                            # Dates in documents are written as their ISO
+                            # strings, as in the download endpoint's files
+                            document = yaml.safe_load(entity_data)
+                            out.write(json.dumps(document, default=str))
+                        else:
+                            out.write("---\n")
+                            out.write(entity_data)
+                        exported += 1
+                    last_id = rows[-1][0]
+                    context.update(
+                        exported / total if total else 1.0,
+                        f"Exported {exported} of {total} entities",
+                    )
+            if export_format == "json":
+                out.write("]")
+        os.replace(partial, path)
+    finally:
+        partial.unlink(missing_ok=True)
+
+    exports = sorted(
+        (p for p in export_dir.glob("catalog_*") if p.suffix in (".yaml", ".json")),
+        key=lambda p: p.stat().st_mtime,
+    )
+    for old_export in exports[:-KEEP_EXPORTS]:
+        old_export.unlink()
+
+    return {"path": str(path), "entities": exported, "bytes": path.stat().st_size}
+
+
+def _prepare_import(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Store the documents to import in a file rather than in the job record"""
+    if "yaml" in params:
+        if not isinstance(params["yaml"], str):
+            raise ValueError("yaml must be a string of one or more YAML documents")
+        content = params["yaml"]
+    elif isinstance(params.get("documents"), list):
+        content = yaml.safe_dump_all(params["documents"])
+    else:
+        raise ValueError("Provide 'yaml' (a multi-document string) or 'documents'")
+
+    import_dir = Path(current_app.config["DATA_DIR"]) / "imports"
+    import_dir.mkdir(exist_ok=True)
+    source = import_dir / f"{uuid.uuid4().hex}.yaml"
+    source.write_text(content, encoding="utf-8")
+    return {"source": source.name, "bytes": len(content.encode("utf-8"))}
+
+
+def _import_batch(shard, documents: List[tuple]) -> tuple:
+    """Create the entities in one shard's batch, skipping existing ones
+
+    Returns (created, skipped) lists of (index, entity summary).
+    """
+    from app.snapshot import catalog_snapshot
+    from app.static_catalog import static_catalog
+    from app.suggest import suggestion_index
+
+    keys = {
+        (doc["kind"], doc["metadata"]["namespace"], doc["metadata"]["name"])
+        for _, doc in documents
+    }
+    created, skipped, new_columns = [], [], []
+    with db_manager.session_scope(shard) as session:
+        existing = set(
+            session.execute(
+                select(
+                    CatalogEntity.kind, CatalogEntity.namespace, CatalogEntity.name
+                ).where(
+                    tuple_(
+                        CatalogEntity.kind, CatalogEntity.namespace, CatalogEntity.name
+                    ).in_(keys)
+                )
+            ).all()
+        )
+        for index, doc in documents:
+            key = (doc["kind"], doc["metadata"]["namespace"], doc["metadata"]["name"])
+            if key in existing:
+                skipped.append(index)
+                continue
+            existing.add(key)
+            columns = entity_columns(doc)
+            entity = CatalogEntity(
+                **columns,
+                entity_data=yaml.dump(doc),
+                content_hash=compute_content_hash(doc),
+            )
+            entity.id = db_manager.next_entity_id(session, shard)
+            session.add(entity)
+            session.flush()
+            record_revision(session, entity, None)
+            created.append(index)
+            new_columns.append(columns)
+
+    for columns in new_columns:
+        suggestion_index.apply(None, columns)
+    if new_columns:
+        catalog_snapshot.notify_write()
+        static_catalog.notify_write()
+    return created, skipped
+
+
+@job_type("import", prepare=_prepare_import)
+def run_import(context: JobContext) -> Dict[str, Any]:
+    """Validate and create entities from a multi-document YAML file
+
+    Entities whose kind, namespace and name already exist are skipped.
+    """
+    source = Path(current_app.config["DATA_DIR"]) / "imports" / context.params["source"]
+    try:
+        with open(source, encoding="utf-8") as f:
+            documents = [doc for doc in yaml.safe_load_all(f) if doc is not None]
+
+        errors, created, skipped = [], 0, 0
+        for start in range(0, len(documents), BATCH_SIZE):
+            by_shard: Dict[Any, List[tuple]] = {}
+            for index, doc in enumerate(documents[start : start + BATCH_SIZE], start):
+                validation_errors = validate_entity(doc)
+                if not validation_errors:
+                    validation_errors = validate_columns(entity_columns(doc))
+                if validation_errors:
+                    errors.append({"index": index, "errors": validation_errors})
+                    continue
+                shard = db_manager.shard_for(doc["metadata"]["namespace"])
+                by_shard.setdefault(shard, []).append((index, doc))
+
+            for shard, batch in by_shard.items():
+                batch_created, batch_skipped = _import_batch(shard, batch)
+                created += len(batch_created)
+                skipped += len(batch_skipped)
+
+            done = min(start + BATCH_SIZE, len(documents))
+            context.update(
+                done / len(documents), f"Imported {done} of {len(documents)} documents"
+            )
+    finally:
+        source.unlink(missing_ok=True)
+
+    return {
+        "documents": len(documents),
+        "created": created,
+        "skipped": skipped,
+        "invalid": len(errors),
+        "errors": errors[:100],
+    }
+
+
+# Create job manager instance
+job_manager = JobManager()
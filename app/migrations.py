@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+"""Versioned schema migrations
+
+Each migration is applied once, in order, and recorded in the
+``schema_version`` table. On a database that is already up to date startup
+costs a single query and no schema reflection.
+
+Migrations must be idempotent against a database created from the current
+models, because migration 1 creates every table from the model metadata.
+
+Workers starting together migrate one at a time: the runner takes SQLite's
+write lock with BEGIN IMMEDIATE and re-reads the applied version inside it,
+so a worker that waited finds the work done.
+"""
+
+from datetime import datetime, timezone
+from typing import Callable, List, NamedTuple
+from sqlalchemy import Connection, Engine, inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateColumn
+from app.database import Base
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def _add_column(conn: Connection, table_name: str, column_name: str) -> None:
+    """Add a model column to an existing table unless it is already present"""
+    existing = {col["name"] for col in inspect(conn).get_columns(table_name)}
+    if column_name in existing:
+        return
+    column = Base.metadata.tables[table_name].c[column_name]
+    ddl = CreateColumn(column).compile(dialect=conn.dialect)
+    try:
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {ddl}"))
+    except OperationalError as e:
+        if "duplicate column" not in str(e):
+            raise
+
+
+def _create_tables(conn: Connection) -> None:
+    Base.metadata.create_all(conn, checkfirst=True)
+
+
+def _add_content_hash(conn: Connection) -> None:
+    _add_column(conn, "catalog_entities", "content_hash")
+
+
+def _create_entity_revisions(conn: Connection) -> None:
+    Base.metadata.create_all(
+        conn, tables=[Base.metadata.tables["entity_revisions"]], checkfirst=True
+    )
+
+
+def _create_background_jobs(conn: Connection) -> None:
+    Base.metadata.create_all(
+        conn, tables=[Base.metadata.tables["background_jobs"]], checkfirst=True
+    )
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Create catalog tables", _create_tables),
+    Migration(2, "Add catalog_entities.content_hash", _add_content_hash),
+    Migration(3, "Create entity_revisions", _create_entity_revisions),
+    Migration(4, "Create background_jobs", _create_background_jobs),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+# How long a worker waits for another worker's migrations to finish
+MIGRATION_LOCK_TIMEOUT_MS = 120000
+
+
+def current_version(engine: Engine) -> int:
+    """Return the highest applied migration version, creating the table if needed"""
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS schema_version ("
+                "version INTEGER PRIMARY KEY, "
+                "description VARCHAR(200) NOT NULL, "
+                "applied_at VARCHAR(32) NOT NULL)"
+            )
+        )
+        version = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+    return version or 0
+
+
+def ensure_shard_sequence(engine: Engine) -> None:
+    """Create the single-row id sequence used by a shard database"""
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS shard_sequence ("
+                "id INTEGER PRIMARY KEY CHECK (id = 0), "
+                "value INTEGER NOT NULL)"
+            )
+        )
+        conn.execute(
+            text("INSERT OR IGNORE INTO shard_sequence (id, value) VALUES (0, 0)")
+        )
+
+
+def ensure_move_journal(engine: Engine) -> None:
+    """Create the table recording entity moves into a shard database
+
+    A row is written in the same transaction that copies an entity in and
+    removed once the source copy is gone, so a move interrupted between
+    the two can be finished on the next startup.
+    """
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS shard_moves ("
+                "entity_id INTEGER PRIMARY KEY, "
+                "source VARCHAR(100))"
+            )
+        )
+
+
+def _applied_version(conn: Connection) -> int:
+    return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    """Apply pending migrations in order and return the versions applied"""
+    # Register all models with the metadata before any table is created
+    import app.models  # noqa: F401
+
+    if current_version(engine) >= LATEST_VERSION:
+        return []
+
+    applied = []
+    # AUTOCOMMIT stops the driver from issuing its own BEGIN, so the
+    # transaction below is the one that takes the write lock
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        busy_timeout = conn.exec_driver_sql("PRAGMA busy_timeout").scalar()
+        # Wait for another worker's migrations rather than failing
+        conn.exec_driver_sql(f"PRAGMA busy_timeout = {MIGRATION_LOCK_TIMEOUT_MS}")
+        try:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                version = _applied_version(conn)
+                for migration in MIGRATIONS:
+                    if migration.version <= version:
+                        continue
+                    migration.upgrade(conn)
+                    conn.execute(
+                        text(
+                            "INSERT INTO schema_version "
+                            "(version, description, applied_at) "
+                            "VALUES (:version, :description, :applied_at)"
+                        ),
+                        {
+                            "version": migration.version,
+                            "description": migration.description,
+                            "applied_at": datetime.now(timezone.utc).isoformat(),
+                        },
+                    )
+                    applied.append(migration.version)
+            except BaseException:
+                conn.exec_driver_sql("ROLLBACK")
+                raise
+            conn.exec_driver_sql("COMMIT")
+        finally:
+            conn.exec_driver_sql(f"PRAGMA busy_timeout = {busy_timeout}")
+
+    for migration in MIGRATIONS:
+        if migration.version in applied:
+            logger.info(
+                "Applied migration %s: %s", migration.version, migration.description
+            )
+    if not applied:
+        logger.info("Migrations already applied by another worker")
+    return applied
@@ -1,14 +1,65 @@
 #!/usr/bin/env python3
 
+import hashlib
+import json
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Optional
 from dataclasses import field
+import yaml
 from slugify import slugify
-from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import Text, String, DateTime, Index
+from sqlalchemy.orm import Mapped, column_property, mapped_column
+from sqlalchemy import (
+    func,
+    Text,
+    String,
+    DateTime,
+    Index,
+    Integer,
+    Boolean,
+    LargeBinary,
+    Float,
+)
 from app.database import db
 
 
+def compute_content_hash(entity_data: Any) -> str:
+    """Return a SHA-256 hex digest of the canonicalized entity document"""
+    canonical = json.dumps(
+        entity_data,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# Indexed entity columns and where their values live in the entity document
+ENTITY_COLUMNS = {
+    "kind": ("kind",),
+    "name": ("metadata", "name"),
+    "namespace": ("metadata", "namespace"),
+    "title": ("metadata", "title"),
+    "description": ("metadata", "description"),
+    "owner": ("metadata", "owner"),
+    "system": ("spec", "system"),
+    "lifecycle": ("spec", "lifecycle"),
+}
+
+
+def entity_columns(entity_data: Dict[str, Any], columns=None) -> Dict[str, Any]:
+    """Extract indexed column values from an entity document"""
+    values = {}
+    for column, path in ENTITY_COLUMNS.items():
+        if columns is not None and column not in columns:
+            continue
+        value = entity_data
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        values[column] = value
+    return values
+
+
 class CatalogEntity(db.Model):
     """Catalog entity model using SQLAlchemy 3.0 features"""
 
@@ -69,6 +120,13 @@ class CatalogEntity(db.Model):
         info={"description": "Detailed description of the entity"},
     )
 
+    content_hash: Mapped[Optional[str]] = mapped_column(
+        String(64),
+        nullable=True,
+        default=None,
+        info={"description": "SHA-256 of the canonicalized entity document"},
+    )
+
     # Timestamps with server defaults
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
@@ -98,6 +156,13 @@ class CatalogEntity(db.Model):
         """Generate a unique name for the entity based on kind and name"""
         return f"{self.kind.lower()}-{slugify(self.name)}"
 
+    @property
+    def etag(self) -> str:
+        """Content hash used as the entity's ETag, computed for legacy rows"""
+        if self.content_hash is None:
+            return compute_content_hash(yaml.safe_load(self.entity_data))
+        return self.content_hash
+
     def to_dict(self) -> dict:
         """Convert entity to dictionary representation"""
         return {
@@ -110,6 +175,165 @@ class CatalogEntity(db.Model):
             "owner": self.owner,
             "system": self.system,
             "lifecycle": self.lifecycle,
+            "content_hash": self.content_hash,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
         }
+
+
+class EntityRevision(db.Model):
+    """One stored version of a catalog entity's document
+
+    Every few revisions the full document is stored; the revisions in
+    between hold a compressed line diff against the previous version.
+    """
+
+    __tablename__ = "entity_revisions"
+
+    id: Mapped[int] = mapped_column(init=False, primary_key=True, autoincrement=True)
+
+    entity_id: Mapped[int] = mapped_column(
+        Integer, nullable=False, info={"description": "Catalog entity id"}
+    )
+
+    revision: Mapped[int] = mapped_column(
+        Integer, nullable=False, info={"description": "Version number, from 1"}
+    )
+
+    is_snapshot: Mapped[bool] = mapped_column(
+        Boolean,
+        nullable=False,
+        info={"description": "Whether data holds the full document or a diff"},
+    )
+
+    data: Mapped[bytes] = mapped_column(
+        LargeBinary,
+        nullable=False,
+        info={"description": "zlib-compressed full document or diff"},
+    )
+
+    content_hash: Mapped[Optional[str]] = mapped_column(
+        String(64),
+        nullable=True,
+        default=None,
+        info={"description": "Content hash of this version's document"},
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default_factory=datetime.utcnow,
+        nullable=False,
+        init=False,
+    )
+
+    # Size of data, computed by the database so listings can defer the blob
+    stored_bytes: Mapped[int] = column_property(func.length(data))
+
+    __table_args__ = (
+        Index("idx_revision_entity", "entity_id", "revision", unique=True),
+    )
+
+    def to_dict(self) -> dict:
+        """Convert revision metadata to dictionary representation"""
+        return {
+            "revision": self.revision,
+            "snapshot": self.is_snapshot,
+            "stored_bytes": self.stored_bytes,
+            "content_hash": self.content_hash,
+            "created_at": self.created_at.isoformat(),
+        }
+
+
+class BackgroundJob(db.Model):
+    """A long-running operation executed by the in-process job runner"""
+
+    __tablename__ = "background_jobs"
+
+    id: Mapped[int] = mapped_column(init=False, primary_key=True, autoincrement=True)
+
+    job_type: Mapped[str] = mapped_column(
+        String(50), nullable=False, info={"description": "Registered job type"}
+    )
+
+    params: Mapped[str] = mapped_column(
+        Text, nullable=False, info={"description": "JSON-encoded job parameters"}
+    )
+
+    status: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        default="queued",
+        info={"description": "queued, running, succeeded, failed or cancelled"},
+    )
+
+    progress: Mapped[float] = mapped_column(
+        Float, nullable=False, default=0.0, info={"description": "Fraction done, 0-1"}
+    )
+
+    message: Mapped[Optional[str]] = mapped_column(
+        Text, nullable=True, default=None, info={"description": "Current step"}
+    )
+
+    result: Mapped[Optional[str]] = mapped_column(
+        Text, nullable=True, default=None, info={"description": "JSON-encoded result"}
+    )
+
+    error: Mapped[Optional[str]] = mapped_column(
+        Text, nullable=True, default=None, info={"description": "Failure reason"}
+    )
+
+    cancel_requested: Mapped[bool] = mapped_column(
+        Boolean,
+        nullable=False,
+        default=False,
+        info={"description": "Set to ask the running job to stop"},
+    )
+
+    worker: Mapped[Optional[str]] = mapped_column(
+        String(100),
+        nullable=True,
+        default=None,
+        info={"description": "host:pid of the process that accepted the job"},
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default_factory=datetime.utcnow,
+        nullable=False,
+        init=False,
+    )
+
+    started_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True, default=None
+    )
+
+    finished_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True, default=None
+    )
+
+    __table_args__ = (Index("idx_job_status", "status", "created_at"),)
+
+    def to_dict(self) -> dict:
+        """Convert job to dictionary representation, with elapsed time and ETA"""
+        elapsed = eta = None
+        if self.started_at is not None:
+            end = self.finished_at or datetime.utcnow()
+            elapsed = (end - self.started_at).total_seconds()
+            if self.status == "running" and 0 < self.progress < 1:
+                eta = elapsed * (1 - self.progress) / self.progress
+        return {
+            "id": self.id,
+            "type": self.job_type,
+            "status": self.status,
+            "params": json.loads(self.params),
+            "progress": round(self.progress, 4),
+            "message": self.message,
+            "result": json.loads(self.result) if self.result else None,
+            "error": self.error,
+            "cancel_requested": self.cancel_requested,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "elapsed_seconds": round(elapsed, 3) if elapsed is not None else None,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+        }
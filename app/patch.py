@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+
+from copy import deepcopy
+from typing import Any, Sequence
+
+MERGE_PATCH_MIMETYPE = "application/merge-patch+json"
+
+
+def apply_merge_patch(target: Any, patch: Any) -> Any:
+    """Apply an RFC 7396 JSON Merge Patch to target and return the result
+
+    The target is not modified; a patched copy is returned.
+    """
+    if not isinstance(patch, dict):
+        return deepcopy(patch)
+
+    result = deepcopy(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+
+def patch_touches(patch: Any, path: Sequence[str]) -> bool:
+    """Return True if applying patch may change the value found at path"""
+    node = patch
+    for key in path:
+        if not isinstance(node, dict):
+            return True
+        if key not in node:
+            return False
+        node = node[key]
+    return True
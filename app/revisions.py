@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+import difflib
+import json
+import zlib
+from typing import List, Optional
+from flask import current_app
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session, defer
+from app.models import CatalogEntity, EntityRevision
+
+
+def make_delta(old_text: str, new_text: str) -> list:
+    """Return a line diff turning old_text into new_text
+
+    Each entry is [start, end, lines]: replace old lines start:end with lines.
+    """
+    old_lines = old_text.splitlines(keepends=True)
+    new_lines = new_text.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    return [
+        [i1, i2, new_lines[j1:j2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_delta(old_text: str, delta: list) -> str:
+    """Apply a diff produced by make_delta"""
+    lines = old_text.splitlines(keepends=True)
+    # Apply from the end so earlier offsets stay valid
+    for start, end, new_lines in reversed(delta):
+        lines[start:end] = new_lines
+    return "".join(lines)
+
+
+def _encode(payload) -> bytes:
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+
+def _decode(data: bytes):
+    return json.loads(zlib.decompress(data))
+
+
+def record_revision(
+    session: Session, entity: CatalogEntity, previous_text: Optional[str]
+) -> int:
+    """Store the entity's current document as its next revision
+
+    previous_text is the document the entity held before this write, or
+    None for a new entity. An entity created before revisions were kept
+    gets that previous document recorded as revision 1 first.
+    """
+    interval = current_app.config.get("REVISION_SNAPSHOT_INTERVAL", 20)
+    latest, last_snapshot = session.execute(
+        select(
+            func.max(EntityRevision.revision),
+            func.max(EntityRevision.revision).filter(EntityRevision.is_snapshot),
+        ).where(EntityRevision.entity_id == entity.id)
+    ).one()
+
+    if latest is None and previous_text is not None:
+        session.add(
+            EntityRevision(
+                entity_id=entity.id,
+                revision=1,
+                is_snapshot=True,
+                data=_encode(previous_text),
+            )
+        )
+        latest = last_snapshot = 1
+
+    revision = (latest or 0) + 1
+    if previous_text is None or revision - last_snapshot >= interval:
+        is_snapshot, payload = True, entity.entity_data
+    else:
+        is_snapshot, payload = False, make_delta(previous_text, entity.entity_data)
+
+    session.add(
+        EntityRevision(
+            entity_id=entity.id,
+            revision=revision,
+            is_snapshot=is_snapshot,
+            data=_encode(payload),
+            content_hash=entity.content_hash,
+        )
+    )
+    return revision
+
+
+def list_revisions(session: Session, entity_id: int) -> List[EntityRevision]:
+    """Return an entity's revisions, newest first, without their data"""
+    stmt = (
+        select(EntityRevision)
+        .options(defer(EntityRevision.data, raiseload=True))
+        .where(EntityRevision.entity_id == entity_id)
+        .order_by(EntityRevision.revision.desc())
+    )
+    return session.execute(stmt).scalars().all()
+
+
+def load_revision(session: Session, entity_id: int, revision: int) -> Optional[str]:
+    """Reconstruct the document text of one revision, or None if it does not exist
+
+    Only the nearest full snapshot at or before the revision and the diffs
+    after it are read.
+    """
+    base = session.execute(
+        select(func.max(EntityRevision.revision)).where(
+            EntityRevision.entity_id == entity_id,
+            EntityRevision.is_snapshot,
+            EntityRevision.revision <= revision,
+        )
+    ).scalar()
+    if base is None:
+        return None
+
+    stmt = (
+        select(EntityRevision.revision, EntityRevision.is_snapshot, EntityRevision.data)
+        .where(
+            EntityRevision.entity_id == entity_id,
+            EntityRevision.revision.between(base, revision),
+        )
+        .order_by(EntityRevision.revision)
+    )
+    text = None
+    found = None
+    for found, is_snapshot, data in session.execute(stmt):
+        payload = _decode(data)
+        text = payload if is_snapshot else apply_delta(text, payload)
+    return text if found == revision else None
+
+
+def delete_revisions(session: Session, entity_id: int) -> None:
+    session.execute(delete(EntityRevision).where(EntityRevision.entity_id == entity_id))
@@ -1,35 +1,155 @@
-from flask import Blueprint, render_template, request, jsonify, send_file, current_app
-from sqlalchemy import select, delete
+from flask import Blueprint, Response, render_template, request, jsonify, send_file, current_app, after_this_request
+from sqlalchemy import select, delete, func, or_, tuple_
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from sqlalchemy.orm import Session
-from app.models import CatalogEntity
-from app.schema import validate_entity, CATALOG_FIELDS
+from sqlalchemy.orm import Session, defer
+from sqlalchemy.orm.exc import StaleDataError
+from app.models import CatalogEntity, compute_content_hash, entity_columns, ENTITY_COLUMNS
+from app.schema import validate_entity, validate_columns, CATALOG_FIELDS
 from app.database import db_manager
+from app.patch import apply_merge_patch, patch_touches, MERGE_PATCH_MIMETYPE
+from app.snapshot import catalog_snapshot, INDEXED_FIELDS
+from app.admission import admission_controller
+from app.suggest import suggestion_index, SUGGEST_FIELDS
+from app.jobs import job_manager, JobQueueFull
+from app.static_catalog import static_catalog
+from app.revisions import record_revision, list_revisions, load_revision, delete_revisions
 import yaml
 import io
+import heapq
 from typing import List, Tuple, Dict, Any
 from datetime import datetime, timezone
 
 bp = Blueprint('main', __name__)
 
+def _store_document(session: Session, entity: CatalogEntity, entity_data: Dict[str, Any],
+                    content_hash: str, columns=None) -> None:
+    """Write a new document to an entity and record it as a revision"""
+    previous_text = entity.entity_data
+    before = {field: getattr(entity, field) for field in SUGGEST_FIELDS}
+    update_data = {
+        **entity_columns(entity_data, columns),
+        'entity_data': yaml.dump(entity_data),
+        'content_hash': content_hash
+    }
+
+    for key, value in update_data.items():
+        setattr(entity, key, value)
+
+    # Flush to ensure all changes are applied
+    session.flush()
+    record_revision(session, entity, previous_text)
+    _update_suggestions_after_write(
+        before, {field: getattr(entity, field) for field in SUGGEST_FIELDS})
+
+def _rehome_entity(entity_id: int, shard, namespace: str) -> None:
+    """Move an entity to the shard owning its namespace after a namespace change"""
+    target = db_manager.shard_for(namespace)
+    if target != shard:
+        db_manager.move_rows(shard, target, CatalogEntity.id == entity_id)
+
+def _distinct_by_id(items, entity_id):
+    """Skip repeated entities, which both shards return while a move is in flight"""
+    seen = set()
+    for item in items:
+        key = entity_id(item)
+        if key not in seen:
+            seen.add(key)
+            yield item
+
+def _refresh_snapshot_after_write() -> None:
+    """Refresh the read snapshot and static files once this request's write has been committed"""
+    @after_this_request
+    def refresh(response):
+        catalog_snapshot.notify_write()
+        static_catalog.notify_write()
+        return response
+
+def _update_suggestions_after_write(before, after) -> None:
+    """Apply this request's field changes to the suggestion index if it succeeds"""
+    @after_this_request
+    def update(response):
+        if response.status_code < 400:
+            suggestion_index.apply(before, after)
+        return response
+
+def _precondition_failed(etag: str) -> bool:
+    """Return True when the request carries an If-Match header that does not match etag"""
+    return bool(request.if_match) and not request.if_match.contains(etag)
+
+def _parse_entity_ref(ref: str) -> Tuple[str, str, str]:
+    """Split an entity ref of the form [kind:][namespace/]name
+
+    Returns (kind, namespace, name); kind is lowercased and may be empty,
+    namespace defaults to 'default'.
+    """
+    kind, _, rest = ref.rpartition(':')
+    namespace, _, name = rest.rpartition('/')
+    return kind.lower(), namespace or 'default', name
+
 @bp.route('/')
 def index():
     """Render the main application page"""
     return render_template('index.html', fields=CATALOG_FIELDS)
 
+@bp.route('/api/metrics/admission', methods=['GET'])
+def admission_metrics() -> Tuple[Dict[str, Any], int]:
+    """Report admission control queue depths and shed counts"""
+    return jsonify({
+        'status': 'success',
+        'admission': admission_controller.metrics()
+    }), 200
+
+@bp.route('/api/suggest', methods=['GET'])
+def suggest() -> Tuple[Dict[str, Any], int]:
+    """Suggest existing values of an entity field for typeahead, most used first"""
+    field = request.args.get('field', '')
+    if field not in SUGGEST_FIELDS:
+        return jsonify({
+            'status': 'error',
+            'type': 'validation_error',
+            'message': f'field must be one of: {", ".join(SUGGEST_FIELDS)}'
+        }), 400
+    limit = max(0, min(request.args.get('limit', 0, type=int), 50))
+
+    try:
+        suggestions = suggestion_index.search(field, request.args.get('prefix', ''), limit)
+    except SQLAlchemyError as e:
+        current_app.logger.error("Database error in suggest: %s", e)
+        return jsonify({
+            'status': 'error',
+            'type': 'database_error',
+            'message': 'Failed to load suggestions',
+            'details': str(e)
+        }), 500
+    return jsonify({
+        'status': 'success',
+        'field': field,
+        'suggestions': suggestions
+    }), 200
+
 @bp.route('/api/entity', methods=['GET'])
 def list_entities() -> Tuple[Dict[str, List[Dict[str, Any]]], int]:
-    """List all catalog entities"""
+    """List all catalog entities, optionally filtered by kind, owner, namespace or system"""
     try:
-        with db_manager.session_scope() as session:
-            stmt = select(CatalogEntity).order_by(CatalogEntity.created_at.desc())
-            entities = session.execute(stmt).scalars().all()
+        filters = {field: request.args[field] for field in INDEXED_FIELDS if field in request.args}
+        if catalog_snapshot.enabled:
             return jsonify({
                 'status': 'success',
-                'entities': [entity.to_dict() for entity in entities]
+                'entities': catalog_snapshot.query(**filters)
             }), 200
+
+        stmt = select(CatalogEntity).filter_by(**filters).order_by(CatalogEntity.created_at.desc())
+        # Each shard returns its entities newest first; merge keeps that order
+        results = db_manager.fan_out(lambda session: session.execute(stmt).scalars().all())
+        entities = _distinct_by_id(
+            heapq.merge(*results, key=lambda entity: entity.created_at, reverse=True),
+            lambda entity: entity.id)
+        return jsonify({
+            'status': 'success',
+            'entities': [entity.to_dict() for entity in entities]
+        }), 200
     except SQLAlchemyError as e:
-        current_app.logger.error(f"Database error in list_entities: {str(e)}")
+        current_app.logger.error("Database error in list_entities: %s", e)
         return jsonify({
             'status': 'error',
             'type': 'database_error',
@@ -49,7 +169,7 @@ def create_entity() -> Tuple[Dict[str, Any], int]:
             else:
                 entity_data = data
         except yaml.YAMLError as e:
-            current_app.logger.warning(f"YAML parse error: {str(e)}")
+            current_app.logger.warning("YAML parse error: %s", e)
             return jsonify({
                 'status': 'error',
                 'type': 'yaml_parse_error',
@@ -60,7 +180,7 @@ def create_entity() -> Tuple[Dict[str, Any], int]:
         # Validate entity structure
         validation_errors = validate_entity(entity_data)
         if validation_errors:
-            current_app.logger.warning(f"Validation errors: {validation_errors}")
+            current_app.logger.warning("Validation errors: %s", validation_errors)
             return jsonify({
                 'status': 'error',
                 'type': 'validation_error',
@@ -68,36 +188,33 @@ def create_entity() -> Tuple[Dict[str, Any], int]:
                 'errors': validation_errors
             }), 400
 
-        metadata = entity_data['metadata']
-        
         # Create and save entity using session context manager
         try:
-            with db_manager.session_scope() as session:
+            shard = db_manager.shard_for(entity_data['metadata']['namespace'])
+            with db_manager.session_scope(shard) as session:
                 entity = CatalogEntity(
-                    kind=entity_data['kind'],
-                    name=metadata['name'],
-                    namespace=metadata['namespace'],
-                    title=metadata.get('title'),
-                    description=metadata['description'],
-                    owner=metadata['owner'],
-                    system=entity_data['spec']['system'],
-                    lifecycle=entity_data['spec']['lifecycle'],
-                    entity_data=yaml.dump(entity_data)
+                    **entity_columns(entity_data),
+                    entity_data=yaml.dump(entity_data),
+                    content_hash=compute_content_hash(entity_data)
                 )
+                entity.id = db_manager.next_entity_id(session, shard)
                 session.add(entity)
                 # Flush to get the ID without committing
                 session.flush()
+                record_revision(session, entity, None)
                 entity_dict = entity.to_dict()
                 
-                current_app.logger.info(f"Created entity: {entity.kind}/{entity.name}")
+                _refresh_snapshot_after_write()
+                _update_suggestions_after_write(None, entity_dict)
+                current_app.logger.info("Created entity: %s/%s", entity.kind, entity.name)
                 return jsonify({
                     'status': 'success',
                     'message': 'Entity created successfully',
                     'entity': entity_dict
-                }), 201
+                }), 201, {'ETag': f'"{entity.content_hash}"'}
 
         except IntegrityError as e:
-            current_app.logger.error(f"Database integrity error: {str(e)}")
+            current_app.logger.error("Database integrity error: %s", e)
             return jsonify({
                 'status': 'error',
                 'type': 'database_integrity_error',
@@ -106,7 +223,7 @@ def create_entity() -> Tuple[Dict[str, Any], int]:
             }), 409
 
     except Exception as e:
-        current_app.logger.error(f"Unexpected error in create_entity: {str(e)}")
+        current_app.logger.error("Unexpected error in create_entity: %s", e)
         return jsonify({
             'status': 'error',
             'type': 'unexpected_error',
@@ -114,11 +231,134 @@ def create_entity() -> Tuple[Dict[str, Any], int]:
             'details': str(e)
         }), 500
 
+@bp.route('/api/entity/batch-get', methods=['POST'])
+def batch_get_entities() -> Tuple[Dict[str, Any], int]:
+    """Resolve a list of entity ids and refs with one query per shard
+
+    The body is {"ids": [...], "include_documents": false}; each item is a
+    numeric id or an entity ref such as "component:default/payments".
+    Entities are returned in request order and unresolved items are listed
+    under 'missing'.
+    """
+    data = request.get_json(silent=True)
+    items = data.get('ids') if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return jsonify({
+            'status': 'error',
+            'type': 'validation_error',
+            'message': 'Request body must be an object with an "ids" list',
+            'errors': ['ids: expected a list of entity ids or refs']
+        }), 400
+
+    limit = current_app.config.get('BATCH_GET_LIMIT', 100)
+    if len(items) > limit:
+        return jsonify({
+            'status': 'error',
+            'type': 'batch_too_large',
+            'message': f'At most {limit} entities can be fetched per request',
+            'details': {'limit': limit, 'requested': len(items)}
+        }), 400
+
+    # Each id or normalized ref maps to every item naming it, so aliases
+    # such as 'Component:x/y' and 'component:x/y' are all matched
+    ids, refs, errors = {}, {}, []
+    for item in items:
+        if isinstance(item, int) and not isinstance(item, bool):
+            ids.setdefault(item, [item])
+        elif isinstance(item, str) and item.strip():
+            kind, namespace, name = _parse_entity_ref(item.strip())
+            if not name:
+                errors.append(f'{item}: missing entity name')
+            refs.setdefault((kind, namespace, name), []).append(item)
+        else:
+            errors.append(f'{item!r}: expected an integer id or an entity ref string')
+    if errors:
+        return jsonify({
+            'status': 'error',
+            'type': 'validation_error',
+            'message': 'Invalid entity ids or refs',
+            'errors': errors
+        }), 400
+
+    include_documents = bool(data.get('include_documents'))
+    criteria = []
+    if ids:
+        criteria.append(CatalogEntity.id.in_(list(ids)))
+    # Refs without a kind match any kind
+    typed = [key for key in refs if key[0]]
+    untyped = [key[1:] for key in refs if not key[0]]
+    if typed:
+        criteria.append(tuple_(func.lower(CatalogEntity.kind), CatalogEntity.namespace,
+                               CatalogEntity.name).in_(typed))
+    if untyped:
+        criteria.append(tuple_(CatalogEntity.namespace, CatalogEntity.name).in_(untyped))
+
+    if not criteria:
+        return jsonify({'status': 'success', 'entities': [], 'missing': []}), 200
+
+    stmt = select(CatalogEntity).where(or_(*criteria))
+    if not include_documents:
+        # Legacy rows without a content hash still load it for their ETag
+        stmt = stmt.options(defer(CatalogEntity.entity_data))
+
+    def fetch(session):
+        found = []
+        for entity in session.execute(stmt).scalars():
+            entity_dict = entity.to_dict()
+            entity_dict['content_hash'] = entity.etag
+            if include_documents:
+                entity_dict['document'] = yaml.safe_load(entity.entity_data)
+            found.append(entity_dict)
+        return found
+
+    try:
+        results = db_manager.fan_out(fetch)
+    except SQLAlchemyError as e:
+        current_app.logger.error("Database error in batch_get_entities: %s", e)
+        return jsonify({
+            'status': 'error',
+            'type': 'database_error',
+            'message': 'Failed to retrieve entities',
+            'details': str(e)
+        }), 500
+
+    # Return entities in the order of the first item naming each of them
+    positions = {}
+    for position, item in enumerate(items):
+        positions.setdefault(item, position)
+    entities, matched = [], set()
+    found = (entity for found in results for entity in found)
+    for entity_dict in _distinct_by_id(found, lambda entity: entity['id']):
+        keys = {
+            *ids.get(entity_dict['id'], ()),
+            *refs.get((entity_dict['kind'].lower(), entity_dict['namespace'], entity_dict['name']), ()),
+            *refs.get(('', entity_dict['namespace'], entity_dict['name']), ()),
+        }
+        matched.update(keys)
+        entities.append((min(positions[key] for key in keys), entity_dict['id'], entity_dict))
+    entities.sort(key=lambda entry: entry[:2])
+
+    return jsonify({
+        'status': 'success',
+        'entities': [entity_dict for _, _, entity_dict in entities],
+        'missing': [item for item in positions if item not in matched]
+    }), 200
+
 @bp.route('/api/entity/<int:entity_id>', methods=['GET'])
 def get_entity(entity_id: int) -> Tuple[Dict[str, Any], int]:
     """Get a specific catalog entity"""
     try:
-        with db_manager.session_scope() as session:
+        # Serve from the snapshot; legacy rows without a content hash need
+        # the stored document to compute their ETag
+        entity_dict = catalog_snapshot.get(entity_id) if catalog_snapshot.enabled else None
+        if entity_dict and entity_dict['content_hash']:
+            return jsonify({
+                'status': 'success',
+                'entity': entity_dict
+            }), 200, {'ETag': f'"{entity_dict["content_hash"]}"'}
+
+        shard = db_manager.locate_entity(entity_id)
+        with db_manager.session_scope(shard) as session:
             stmt = select(CatalogEntity).where(CatalogEntity.id == entity_id)
             entity = session.execute(stmt).scalar_one_or_none()
             
@@ -132,10 +372,10 @@ def get_entity(entity_id: int) -> Tuple[Dict[str, Any], int]:
             return jsonify({
                 'status': 'success',
                 'entity': entity.to_dict()
-            }), 200
+            }), 200, {'ETag': f'"{entity.etag}"'}
             
     except SQLAlchemyError as e:
-        current_app.logger.error(f"Database error in get_entity: {str(e)}")
+        current_app.logger.error("Database error in get_entity: %s", e)
         return jsonify({
             'status': 'error',
             'type': 'database_error',
@@ -171,10 +411,9 @@ def update_entity(entity_id: int) -> Tuple[Dict[str, Any], int]:
                 'errors': validation_errors
             }), 400
 
-        metadata = entity_data['metadata']
-        
         # Update entity using session context manager
-        with db_manager.session_scope() as session:
+        shard = db_manager.locate_entity(entity_id)
+        with db_manager.session_scope(shard) as session:
             stmt = select(CatalogEntity).where(CatalogEntity.id == entity_id)
             entity = session.execute(stmt).scalar_one_or_none()
             
@@ -185,35 +424,162 @@ def update_entity(entity_id: int) -> Tuple[Dict[str, Any], int]:
                     'message': 'Entity not found'
                 }), 404
 
-            # Update entity attributes
-            update_data = {
-                'kind': entity_data['kind'],
-                'name': metadata['name'],
-                'namespace': metadata['namespace'],
-                'title': metadata.get('title'),
-                'description': metadata['description'],
-                'owner': metadata['owner'],
-                'system': entity_data['spec']['system'],
-                'lifecycle': entity_data['spec']['lifecycle'],
-                'entity_data': yaml.dump(entity_data)
-            }
-            
-            for key, value in update_data.items():
-                setattr(entity, key, value)
+            # Optimistic concurrency: reject stale writers
+            if _precondition_failed(entity.etag):
+                return jsonify({
+                    'status': 'error',
+                    'type': 'precondition_failed',
+                    'message': 'Entity has been modified since it was last read'
+                }), 412, {'ETag': f'"{entity.etag}"'}
 
-            # Flush to ensure all changes are applied
-            session.flush()
+            # Skip the write entirely when the document is unchanged
+            content_hash = compute_content_hash(entity_data)
+            if content_hash == entity.content_hash:
+                return jsonify({
+                    'status': 'success',
+                    'message': 'Entity unchanged',
+                    'changed': False,
+                    'entity': entity.to_dict()
+                }), 200, {'ETag': f'"{content_hash}"'}
+
+            _store_document(session, entity, entity_data, content_hash)
             entity_dict = entity.to_dict()
-            
-            current_app.logger.info(f"Updated entity: {entity.kind}/{entity.name}")
+
+        _rehome_entity(entity_id, shard, entity_dict['namespace'])
+        _refresh_snapshot_after_write()
+
+        current_app.logger.info("Updated entity: %s/%s", entity.kind, entity.name)
+        return jsonify({
+            'status': 'success',
+            'message': 'Entity updated successfully',
+            'changed': True,
+            'entity': entity_dict
+        }), 200, {'ETag': f'"{content_hash}"'}
+
+    except StaleDataError as e:
+        current_app.logger.warning("Entity %s moved during update: %s", entity_id, e)
+        return jsonify({
+            'status': 'error',
+            'type': 'conflict',
+            'message': 'Entity was moved to another shard during the update; retry the request',
+            'details': str(e)
+        }), 409
+    except IntegrityError as e:
+        current_app.logger.error("Database integrity error in update: %s", e)
+        return jsonify({
+            'status': 'error',
+            'type': 'database_integrity_error',
+            'message': 'Database constraint violation',
+            'details': str(e)
+        }), 409
+    except SQLAlchemyError as e:
+        current_app.logger.error("Database error in update_entity: %s", e)
+        return jsonify({
+            'status': 'error',
+            'type': 'database_error',
+            'message': 'Database error occurred',
+            'details': str(e)
+        }), 500
+    except Exception as e:
+        current_app.logger.error("Unexpected error in update_entity: %s", e)
+        return jsonify({
+            'status': 'error',
+            'type': 'unexpected_error',
+            'message': 'An unexpected error occurred',
+            'details': str(e)
+        }), 500
+
+@bp.route('/api/entity/<int:entity_id>', methods=['PATCH'])
+def patch_entity(entity_id: int) -> Tuple[Dict[str, Any], int]:
+    """Partially update a catalog entity with a JSON Merge Patch (RFC 7396)"""
+    try:
+        if request.mimetype not in (MERGE_PATCH_MIMETYPE, 'application/json'):
             return jsonify({
-                'status': 'success',
-                'message': 'Entity updated successfully',
-                'entity': entity_dict
-            }), 200
+                'status': 'error',
+                'type': 'unsupported_media_type',
+                'message': f'Expected {MERGE_PATCH_MIMETYPE}'
+            }), 415
+
+        patch = request.get_json(force=True, silent=True)
+        if not isinstance(patch, dict):
+            return jsonify({
+                'status': 'error',
+                'type': 'patch_error',
+                'message': 'Merge patch must be a JSON object'
+            }), 400
+
+        shard = db_manager.locate_entity(entity_id)
+        with db_manager.session_scope(shard) as session:
+            stmt = select(CatalogEntity).where(CatalogEntity.id == entity_id)
+            entity = session.execute(stmt).scalar_one_or_none()
+
+            if not entity:
+                return jsonify({
+                    'status': 'error',
+                    'type': 'not_found',
+                    'message': 'Entity not found'
+                }), 404
+
+            if _precondition_failed(entity.etag):
+                return jsonify({
+                    'status': 'error',
+                    'type': 'precondition_failed',
+                    'message': 'Entity has been modified since it was last read'
+                }), 412, {'ETag': f'"{entity.etag}"'}
+
+            entity_data = apply_merge_patch(yaml.safe_load(entity.entity_data), patch)
+
+            # Only the sections named in the patch, and the indexed columns
+            # it touches, can have become invalid
+            columns = [
+                column for column, path in ENTITY_COLUMNS.items()
+                if patch_touches(patch, path)
+            ]
+            validation_errors = validate_entity(entity_data, fields=patch.keys())
+            if not validation_errors:
+                validation_errors = validate_columns(entity_columns(entity_data, columns))
+            if validation_errors:
+                return jsonify({
+                    'status': 'error',
+                    'type': 'validation_error',
+                    'message': 'Entity validation failed',
+                    'errors': validation_errors
+                }), 400
 
+            content_hash = compute_content_hash(entity_data)
+            if content_hash == entity.content_hash:
+                return jsonify({
+                    'status': 'success',
+                    'message': 'Entity unchanged',
+                    'changed': False,
+                    'entity': entity.to_dict()
+                }), 200, {'ETag': f'"{content_hash}"'}
+
+            # Only touch the indexed columns the patch can affect
+            _store_document(session, entity, entity_data, content_hash, columns)
+            entity_dict = entity.to_dict()
+
+        _rehome_entity(entity_id, shard, entity_dict['namespace'])
+        _refresh_snapshot_after_write()
+
+        current_app.logger.info("Patched entity: %s/%s", entity.kind, entity.name)
+        return jsonify({
+            'status': 'success',
+            'message': 'Entity updated successfully',
+            'changed': True,
+            'entity': entity_dict
+        }), 200, {'ETag': f'"{content_hash}"'}
+
+    except StaleDataError as e:
+        current_app.logger.warning("Entity %s moved during patch: %s", entity_id, e)
+        return jsonify({
+            'status': 'error',
+            'type': 'conflict',
+            'message': 'Entity was moved to another shard during the update; retry the request',
+            'details': str(e)
+        }), 409
     except IntegrityError as e:
-        current_app.logger.error(f"Database integrity error in update: {str(e)}")
+        current_app.logger.error("Database integrity error in patch: %s", e)
         return jsonify({
             'status': 'error',
             'type': 'database_integrity_error',
@@ -221,7 +587,7 @@ def update_entity(entity_id: int) -> Tuple[Dict[str, Any], int]:
             'details': str(e)
         }), 409
     except SQLAlchemyError as e:
-        current_app.logger.error(f"Database error in update_entity: {str(e)}")
+        current_app.logger.error("Database error in patch_entity: %s", e)
         return jsonify({
             'status': 'error',
             'type': 'database_error',
@@ -229,7 +595,7 @@ def update_entity(entity_id: int) -> Tuple[Dict[str, Any], int]:
             'details': str(e)
         }), 500
     except Exception as e:
-        current_app.logger.error(f"Unexpected error in update_entity: {str(e)}")
+        current_app.logger.error("Unexpected error in patch_entity: %s", e)
         return jsonify({
             'status': 'error',
             'type': 'unexpected_error',
@@ -241,25 +607,33 @@ def update_entity(entity_id: int) -> Tuple[Dict[str, Any], int]:
 def delete_entity(entity_id: int) -> Tuple[Dict[str, str], int]:
     """Delete a catalog entity"""
     try:
-        with db_manager.session_scope() as session:
-            stmt = delete(CatalogEntity).where(CatalogEntity.id == entity_id)
-            result = session.execute(stmt)
+        shard = db_manager.locate_entity(entity_id)
+        with db_manager.session_scope(shard) as session:
+            stmt = (
+                delete(CatalogEntity)
+                .where(CatalogEntity.id == entity_id)
+                .returning(*(getattr(CatalogEntity, field) for field in SUGGEST_FIELDS))
+            )
+            deleted = session.execute(stmt).mappings().first()
             
-            if result.rowcount == 0:
+            if deleted is None:
                 return jsonify({
                     'status': 'error',
                     'type': 'not_found',
                     'message': 'Entity not found'
                 }), 404
             
-            current_app.logger.info(f"Deleted entity with ID: {entity_id}")
+            delete_revisions(session, entity_id)
+            _refresh_snapshot_after_write()
+            _update_suggestions_after_write(dict(deleted), None)
+            current_app.logger.info("Deleted entity with ID: %s", entity_id)
             return jsonify({
                 'status': 'success',
                 'message': 'Entity deleted successfully'
             }), 200
             
     except SQLAlchemyError as e:
-        current_app.logger.error(f"Database error in delete_entity: {str(e)}")
+        current_app.logger.error("Database error in delete_entity: %s", e)
         return jsonify({
             'status': 'error',
             'type': 'database_error',
@@ -267,11 +641,153 @@ def delete_entity(entity_id: int) -> Tuple[Dict[str, str], int]:
             'details': str(e)
         }), 500
 
+@bp.route('/api/entity/<int:entity_id>/revisions', methods=['GET'])
+def get_entity_revisions(entity_id: int) -> Tuple[Dict[str, Any], int]:
+    """List an entity's stored revisions, newest first"""
+    try:
+        shard = db_manager.locate_entity(entity_id)
+        with db_manager.session_scope(shard) as session:
+            revisions = list_revisions(session, entity_id)
+            if not revisions:
+                return jsonify({
+                    'status': 'error',
+                    'type': 'not_found',
+                    'message': 'No revisions found for entity'
+                }), 404
+
+            return jsonify({
+                'status': 'success',
+                'revisions': [revision.to_dict() for revision in revisions]
+            }), 200
+
+    except SQLAlchemyError as e:
+        current_app.logger.error("Database error in get_entity_revisions: %s", e)
+        return jsonify({
+            'status': 'error',
+            'type': 'database_error',
+            'message': 'Failed to retrieve revisions',
+            'details': str(e)
+        }), 500
+
+@bp.route('/api/entity/<int:entity_id>/revisions/<int:revision>', methods=['GET'])
+def get_entity_revision(entity_id: int, revision: int) -> Tuple[Dict[str, Any], int]:
+    """Get the document of one revision of an entity"""
+    try:
+        shard = db_manager.locate_entity(entity_id)
+        with db_manager.session_scope(shard) as session:
+            text = load_revision(session, entity_id, revision)
+            if text is None:
+                return jsonify({
+                    'status': 'error',
+                    'type': 'not_found',
+                    'message': 'Revision not found'
+                }), 404
+
+            return jsonify({
+                'status': 'success',
+                'revision': revision,
+                'data': yaml.safe_load(text)
+            }), 200
+
+    except SQLAlchemyError as e:
+        current_app.logger.error("Database error in get_entity_revision: %s", e)
+        return jsonify({
+            'status': 'error',
+            'type': 'database_error',
+            'message': 'Failed to retrieve revision',
+            'details': str(e)
+        }), 500
+
+@bp.route('/api/entity/<int:entity_id>/revisions/<int:revision>/restore', methods=['POST'])
+def restore_entity_revision(entity_id: int, revision: int) -> Tuple[Dict[str, Any], int]:
+    """Restore an entity to an earlier revision, recorded as a new revision"""
+    try:
+        shard = db_manager.locate_entity(entity_id)
+        with db_manager.session_scope(shard) as session:
+            stmt = select(CatalogEntity).where(CatalogEntity.id == entity_id)
+            entity = session.execute(stmt).scalar_one_or_none()
+            text = load_revision(session, entity_id, revision) if entity else None
+
+            if text is None:
+                return jsonify({
+                    'status': 'error',
+                    'type': 'not_found',
+                    'message': 'Entity revision not found'
+                }), 404
+
+            if _precondition_failed(entity.etag):
+                return jsonify({
+                    'status': 'error',
+                    'type': 'precondition_failed',
+                    'message': 'Entity has been modified since it was last read'
+                }), 412, {'ETag': f'"{entity.etag}"'}
+
+            entity_data = yaml.safe_load(text)
+            content_hash = compute_content_hash(entity_data)
+            if content_hash == entity.content_hash:
+                return jsonify({
+                    'status': 'success',
+                    'message': 'Entity unchanged',
+                    'changed': False,
+                    'entity': entity.to_dict()
+                }), 200, {'ETag': f'"{content_hash}"'}
+
+            _store_document(session, entity, entity_data, content_hash)
+            entity_dict = entity.to_dict()
+
+        _rehome_entity(entity_id, shard, entity_dict['namespace'])
+        _refresh_snapshot_after_write()
+
+        current_app.logger.info("Restored entity %s to revision %s", entity_id, revision)
+        return jsonify({
+            'status': 'success',
+            'message': f'Entity restored to revision {revision}',
+            'changed': True,
+            'entity': entity_dict
+        }), 200, {'ETag': f'"{content_hash}"'}
+
+    except StaleDataError as e:
+        current_app.logger.warning("Entity %s moved during restore: %s", entity_id, e)
+        return jsonify({
+            'status': 'error',
+            'type': 'conflict',
+            'message': 'Entity was moved to another shard during the update; retry the request',
+            'details': str(e)
+        }), 409
+    except SQLAlchemyError as e:
+        current_app.logger.error("Database error in restore_entity_revision: %s", e)
+        return jsonify({
+            'status': 'error',
+            'type': 'database_error',
+            'message': 'Failed to restore revision',
+            'details': str(e)
+        }), 500
+
 @bp.route('/api/entity/<int:entity_id>/download')
 def download_entity(entity_id: int):
-    """Download entity as YAML file"""
+    """Download an entity: the parsed document as JSON, or with ?format=yaml the YAML file"""
+    file_format = request.args.get('format', 'json')
+    if file_format not in ('json', 'yaml'):
+        return jsonify({
+            'status': 'error',
+            'type': 'validation_error',
+            'message': "format must be 'json' or 'yaml'"
+        }), 400
+
+    # Pre-rendered files are streamed straight from disk
+    if static_catalog.enabled:
+        path = static_catalog.entity_file(entity_id, file_format)
+        if path is not None:
+            if file_format == 'yaml':
+                return send_file(path, mimetype='application/x-yaml', as_attachment=True,
+                                 download_name=f'entity-{entity_id}.yaml',
+                                 max_age=current_app.config.get('STATIC_CATALOG_MAX_AGE', 0))
+            return send_file(path, mimetype='application/json',
+                             max_age=current_app.config.get('STATIC_CATALOG_MAX_AGE', 0))
+
     try:
-        with db_manager.session_scope() as session:
+        shard = db_manager.locate_entity(entity_id)
+        with db_manager.session_scope(shard) as session:
             stmt = select(CatalogEntity).where(CatalogEntity.id == entity_id)
             entity = session.execute(stmt).scalar_one_or_none()
             
@@ -281,6 +797,11 @@ def download_entity(entity_id: int):
                     'type': 'not_found',
                     'message': 'Entity not found'
                 }), 404
+
+            if file_format == 'yaml':
+                return Response(entity.entity_data, mimetype='application/x-yaml', headers={
+                    'Content-Disposition': f'attachment; filename=entity-{entity_id}.yaml'
+                })
                 
             # Parse the YAML data before sending
             yaml_data = yaml.safe_load(entity.entity_data)
@@ -290,7 +811,7 @@ def download_entity(entity_id: int):
             }), 200
             
     except SQLAlchemyError as e:
-        current_app.logger.error(f"Database error in download_entity: {str(e)}")
+        current_app.logger.error("Database error in download_entity: %s", e)
         return jsonify({
             'status': 'error',
             'type': 'database_error',
@@ -298,6 +819,32 @@ def download_entity(entity_id: int):
             'details': str(e)
         }), 500
 
+@bp.route('/api/export', methods=['GET'])
+def export_catalog():
+    """Download the whole catalog as one multi-document YAML file"""
+    if static_catalog.enabled:
+        return send_file(static_catalog.bundle(), mimetype='application/x-yaml',
+                         as_attachment=True, download_name='catalog.yaml',
+                         max_age=current_app.config.get('STATIC_CATALOG_MAX_AGE', 0))
+
+    stmt = select(CatalogEntity.id, CatalogEntity.entity_data).order_by(CatalogEntity.id)
+    try:
+        results = db_manager.fan_out(lambda session: session.execute(stmt).all())
+    except SQLAlchemyError as e:
+        current_app.logger.error("Database error in export_catalog: %s", e)
+        return jsonify({
+            'status': 'error',
+            'type': 'database_error',
+            'message': 'Failed to export catalog',
+            'details': str(e)
+        }), 500
+    rows = _distinct_by_id(heapq.merge(*results), lambda row: row[0])
+    return Response(
+        (f'---\n{entity_data}' for _, entity_data in rows),
+        mimetype='application/x-yaml',
+        headers={'Content-Disposition': 'attachment; filename=catalog.yaml'}
+    )
+
 @bp.route('/api/upload', methods=['POST'])
 def upload_entity() -> Tuple[Dict[str, Any], int]:
     """Upload and validate a YAML entity file"""
@@ -344,7 +891,7 @@ def upload_entity() -> Tuple[Dict[str, Any], int]:
                 'errors': errors
             }), 400
             
-        current_app.logger.info(f"Successfully validated uploaded file: {file.filename}")
+        current_app.logger.info("Successfully validated uploaded file: %s", file.filename)
         return jsonify({
             'status': 'success',
             'message': 'File uploaded and validated successfully',
@@ -352,10 +899,110 @@ def upload_entity() -> Tuple[Dict[str, Any], int]:
         }), 200
         
     except Exception as e:
-        current_app.logger.error(f"Unexpected error in upload_entity: {str(e)}")
+        current_app.logger.error("Unexpected error in upload_entity: %s", e)
         return jsonify({
             'status': 'error',
             'type': 'unexpected_error',
             'message': 'An unexpected error occurred during upload',
             'details': str(e)
         }), 500
+
+@bp.route('/api/jobs', methods=['POST'])
+def submit_job() -> Tuple[Dict[str, Any], int]:
+    """Queue a background job: backup, maintenance, export or import"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('params', {}), dict):
+        return jsonify({
+            'status': 'error',
+            'type': 'validation_error',
+            'message': 'Request body must be {"type": ..., "params": {...}}'
+        }), 400
+
+    try:
+        job = job_manager.submit(data.get('type'), data.get('params', {}))
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'type': 'validation_error',
+            'message': str(e)
+        }), 400
+    except JobQueueFull:
+        return jsonify({
+            'status': 'error',
+            'type': 'overloaded',
+            'message': 'Too many background jobs are queued, retry later'
+        }), 503, {'Retry-After': '30'}
+    except SQLAlchemyError as e:
+        current_app.logger.error("Database error in submit_job: %s", e)
+        return jsonify({
+            'status': 'error',
+            'type': 'database_error',
+            'message': 'Failed to record job',
+            'details': str(e)
+        }), 500
+
+    current_app.logger.info("Queued job %s (%s)", job['id'], job['type'])
+    return jsonify({
+        'status': 'success',
+        'job': job
+    }), 202, {'Location': f"/api/jobs/{job['id']}"}
+
+@bp.route('/api/jobs', methods=['GET'])
+def list_jobs() -> Tuple[Dict[str, Any], int]:
+    """List recent background jobs, newest first"""
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    return jsonify({
+        'status': 'success',
+        'jobs': job_manager.list(request.args.get('status'), limit)
+    }), 200
+
+@bp.route('/api/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id: int) -> Tuple[Dict[str, Any], int]:
+    """Get a background job's status, progress and ETA"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'type': 'not_found',
+            'message': 'Job not found'
+        }), 404
+    return jsonify({
+        'status': 'success',
+        'job': job
+    }), 200
+
+@bp.route('/api/jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_job(job_id: int) -> Tuple[Dict[str, Any], int]:
+    """Cancel a queued job, or ask a running one to stop"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'type': 'not_found',
+            'message': 'Job not found'
+        }), 404
+    # Finished jobs are returned unchanged, without a cancellation request
+    if not job['cancel_requested']:
+        return jsonify({
+            'status': 'error',
+            'type': 'conflict',
+            'message': f"Job already {job['status']}",
+            'job': job
+        }), 409
+    return jsonify({
+        'status': 'success',
+        'message': 'Cancellation requested',
+        'job': job
+    }), 202
+
+@bp.route('/api/jobs/<int:job_id>/download', methods=['GET'])
+def download_job_artifact(job_id: int):
+    """Download the file written by a finished export job"""
+    path = job_manager.artifact(job_id)
+    if path is None:
+        return jsonify({
+            'status': 'error',
+            'type': 'not_found',
+            'message': 'No export file for this job'
+        }), 404
+    return send_file(path, as_attachment=True, download_name=path.name)
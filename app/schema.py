@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 
+from app.models import ENTITY_COLUMNS
+
 REQUIRED_FIELDS = {
     "apiVersion": str,
     "kind": str,
@@ -34,6 +36,7 @@ CATALOG_FIELDS = {
             "label": "Name",
             "required": True,
             "help": "Unique name of the entity",
+            "suggest": True,
         },
         "namespace": {
             "type": "text",
@@ -96,6 +99,7 @@ CATALOG_FIELDS = {
             "label": "Owner",
             "required": True,
             "help": "Owner of the entity (e.g., team-name)",
+            "suggest": True,
         },
     },
     "spec": {
@@ -116,12 +120,18 @@ CATALOG_FIELDS = {
             "label": "System",
             "required": True,
             "help": "System the entity belongs to",
+            "suggest": True,
         },
     },
 }
 
 
-def validate_entity(data):
+def validate_entity(data, fields=None):
+    """Validate an entity document
+
+    When fields is given, only those top-level fields are checked; this is
+    used by partial updates where the rest of the document is known valid.
+    """
     errors = []
 
     # Check required fields
@@ -129,13 +139,40 @@ def validate_entity(data):
         return ["Invalid YAML format"]
 
     for field, field_type in REQUIRED_FIELDS.items():
+        if fields is not None and field not in fields:
+            continue
+
         if field not in data:
             errors.append(f"Missing required field: {field}")
             continue
 
         if field == "metadata" or field == "spec":
+            if not isinstance(data[field], dict):
+                errors.append(f"Invalid field type: {field} must be a mapping")
+                continue
+
             for subfield, subfield_type in REQUIRED_FIELDS[field].items():
                 if subfield not in data[field]:
                     errors.append(f"Missing required field: {field}.{subfield}")
 
     return errors
+
+
+# Indexed columns whose field may be left out of a document
+OPTIONAL_COLUMNS = ("title", "description")
+
+
+def validate_columns(columns):
+    """Validate indexed column values taken from a document by entity_columns()
+
+    validate_entity only checks that fields are present; these values are
+    stored in string columns, so anything else is rejected here.
+    """
+    errors = []
+    for column, value in columns.items():
+        if value is None and column in OPTIONAL_COLUMNS:
+            continue
+        if not isinstance(value, str):
+            path = ".".join(ENTITY_COLUMNS[column])
+            errors.append(f"Invalid field type: {path} must be a string")
+    return errors
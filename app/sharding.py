@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+import bisect
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Entity ids are allocated as sequence * ID_STRIDE + shard index, so ids stay
+# globally unique without coordination and encode the shard they were created
+# on. This also caps the number of shards.
+ID_STRIDE = 1024
+
+
+def _hash(key: str) -> int:
+    """Stable 64-bit hash; the built-in hash() is salted per process"""
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent-hash ring mapping keys to nodes via virtual nodes"""
+
+    def __init__(self, nodes: List[str], vnodes: int = 64):
+        self._ring = sorted(
+            (_hash(f"{node}#{replica}"), node)
+            for node in nodes
+            for replica in range(vnodes)
+        )
+        self._hashes = [point for point, _ in self._ring]
+
+    def node_for(self, key: str) -> str:
+        """Return the node owning key"""
+        if not self._ring:
+            raise ValueError("Hash ring has no nodes")
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+
+class ShardMap:
+    """Namespace to shard routing: a consistent-hash ring plus pinned overrides
+
+    Shards are append-only; a shard's position in the list is its index in
+    entity ids.
+    """
+
+    def __init__(self, shards: List[str], overrides: Optional[Dict[str, str]] = None):
+        if not shards:
+            raise ValueError("A shard map needs at least one shard")
+        if len(shards) > ID_STRIDE:
+            raise ValueError(f"At most {ID_STRIDE} shards are supported")
+        self.shards = list(shards)
+        self.overrides = dict(overrides or {})
+        self._ring = HashRing(self.shards)
+
+    @classmethod
+    def with_shard_count(cls, count: int) -> "ShardMap":
+        return cls([f"shard-{index:02d}" for index in range(count)])
+
+    @classmethod
+    def load(cls, path: Path) -> "ShardMap":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["shards"], data.get("overrides"))
+
+    def save(self, path: Path) -> None:
+        """Write the shard map atomically"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # A unique temporary file, so workers saving at once cannot collide
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(
+                    {"shards": self.shards, "overrides": self.overrides}, f, indent=2
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def shard_for(self, namespace: str) -> str:
+        """Return the shard that stores namespace"""
+        return self.overrides.get(namespace) or self._ring.node_for(namespace)
+
+    def index_of(self, shard: str) -> int:
+        return self.shards.index(shard)
+
+    def home_shard(self, entity_id: int) -> Optional[str]:
+        """Return the shard an entity id was allocated on, if it still exists"""
+        index = entity_id % ID_STRIDE
+        return self.shards[index] if index < len(self.shards) else None
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from flask import Flask
+from sqlalchemy import func, select
+from app.database import db_manager
+from app.models import CatalogEntity
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Summary fields held in the snapshot, in CatalogEntity.to_dict() order
+FIELDS = (
+    "id",
+    "kind",
+    "name",
+    "namespace",
+    "title",
+    "description",
+    "owner",
+    "system",
+    "lifecycle",
+    "content_hash",
+    "created_at",
+    "updated_at",
+)
+
+# Fields with a secondary index, usable as list filters
+INDEXED_FIELDS = ("kind", "owner", "namespace", "system")
+
+# Low-cardinality fields, stored as array("I") codes into a value table
+ENCODED_FIELDS = INDEXED_FIELDS + ("lifecycle",)
+
+# Rows are re-read from this far behind the newest updated_at seen, so a
+# transaction that committed late with an older timestamp is not missed
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+
+class _ValueTable:
+    """Append-only dictionary for the values of ENCODED_FIELDS
+
+    A version and its copies share one table. Only the refresher appends,
+    and a value's code never changes, so readers of an older version can
+    decode it while a newer one is being built.
+    """
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self.codes: Dict[Any, int] = {}
+
+    def encode(self, value: Any) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            # Appended before it is published in codes
+            self.values.append(value)
+            self.codes[value] = code
+        return code
+
+
+class _Columns:
+    """One immutable version of the snapshot, stored column-wise
+
+    Refreshes copy the column arrays (cheap, C-level copies), apply changed
+    rows to the copy and publish it; a published version is never mutated.
+    ENCODED_FIELDS are held as codes into a shared _ValueTable, and their
+    posting lists as arrays of positions keyed by code. Deleted rows are
+    tombstoned in ``alive`` and dropped on compaction, which also starts a
+    fresh value table.
+    """
+
+    def __init__(self, table: Optional[_ValueTable] = None):
+        self.ids = array("q")
+        self.table = table if table is not None else _ValueTable()
+        self.codes: Dict[str, array] = {name: array("I") for name in ENCODED_FIELDS}
+        self.columns: Dict[str, list] = {
+            name: [] for name in FIELDS if name != "id" and name not in ENCODED_FIELDS
+        }
+        self.alive = bytearray()
+        self.positions: Dict[int, int] = {}
+        self.indexes: Dict[str, Dict[int, array]] = {
+            name: {} for name in INDEXED_FIELDS
+        }
+        self.watermark: Optional[datetime] = None
+        self._order: Optional[List[int]] = None
+        self._copied = set()
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def copy(self) -> "_Columns":
+        other = _Columns(self.table)
+        other.ids = array("q", self.ids)
+        other.codes = {name: array("I", codes) for name, codes in self.codes.items()}
+        other.columns = {name: list(values) for name, values in self.columns.items()}
+        other.alive = bytearray(self.alive)
+        other.positions = dict(self.positions)
+        other.indexes = {name: dict(index) for name, index in self.indexes.items()}
+        other.watermark = self.watermark
+        return other
+
+    def _index_list(self, field: str, code: int) -> array:
+        """Return a posting list that is safe to mutate in this version"""
+        index = self.indexes[field]
+        if (field, code) not in self._copied:
+            index[code] = array("I", index.get(code, ()))
+            self._copied.add((field, code))
+        return index[code]
+
+    def _unindex(self, field: str, code: int, position: int) -> None:
+        postings = self._index_list(field, code)
+        postings.remove(position)
+        if not postings:
+            del self.indexes[field][code]
+            self._copied.discard((field, code))
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        position = self.positions.get(row["id"])
+        if position is None:
+            position = len(self.ids)
+            self.ids.append(row["id"])
+            self.alive.append(1)
+            for name, codes in self.codes.items():
+                codes.append(self.table.encode(row[name]))
+            for name, values in self.columns.items():
+                values.append(row[name])
+            for field in INDEXED_FIELDS:
+                self._index_list(field, self.codes[field][position]).append(position)
+            self.positions[row["id"]] = position
+            return
+
+        for name, codes in self.codes.items():
+            old, new = codes[position], self.table.encode(row[name])
+            if old != new:
+                if name in INDEXED_FIELDS:
+                    self._unindex(name, old, position)
+                    self._index_list(name, new).append(position)
+                codes[position] = new
+        for name, values in self.columns.items():
+            values[position] = row[name]
+
+    def remove(self, entity_id: int) -> None:
+        position = self.positions.pop(entity_id)
+        self.alive[position] = 0
+        for field in INDEXED_FIELDS:
+            self._unindex(field, self.codes[field][position], position)
+
+    def compacted(self) -> "_Columns":
+        """Return a version without tombstones or unused values"""
+        other = _Columns()
+        for position in sorted(self.positions.values()):
+            other.upsert(self.row(position))
+        other.watermark = self.watermark
+        return other
+
+    def row(self, position: int) -> Dict[str, Any]:
+        values = self.table.values
+        row = {"id": self.ids[position]}
+        for name in FIELDS[1:]:
+            if name in self.codes:
+                row[name] = values[self.codes[name][position]]
+            else:
+                row[name] = self.columns[name][position]
+        return row
+
+    def lookup(self, field: str, value: Any) -> array:
+        """Positions whose indexed field equals value"""
+        code = self.table.codes.get(value)
+        return self.indexes[field].get(code, array("I"))
+
+    def order(self) -> List[int]:
+        """Live positions, newest created first; computed once per version"""
+        if self._order is None:
+            created = self.columns["created_at"]
+            self._order = sorted(
+                self.positions.values(), key=lambda p: created[p], reverse=True
+            )
+        return self._order
+
+
+class CatalogSnapshot:
+    """Read-optimized, in-process copy of the catalog's summary fields
+
+    Readers take the current version without locking. A single refresher
+    applies rows changed since the last refresh and swaps in a new version.
+    The snapshot is loaded lazily on first use, after which a background
+    thread keeps it fresh; local writes trigger an immediate refresh.
+    """
+
+    def __init__(self, app: Flask = None):
+        self.enabled = False
+        self.refresh_interval = 1.0
+        self._data: Optional[_Columns] = None
+        self._refresh_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """Read snapshot settings; nothing is loaded until first use"""
+        self.enabled = app.config.get("CATALOG_SNAPSHOT", False)
+        self.refresh_interval = app.config.get("SNAPSHOT_REFRESH_SECONDS", 1.0)
+
+    def _current(self) -> _Columns:
+        data = self._data
+        if data is None:
+            self.refresh()
+            data = self._data
+            self._start_refresher()
+        return data
+
+    def _start_refresher(self) -> None:
+        with self._refresh_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="catalog-snapshot", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._dirty.wait(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error("Snapshot refresh failed: %s", e)
+
+    def notify_write(self) -> None:
+        """Called after a committed write; applies it before the response is sent
+
+        A refresh already running may have read the rows before the write
+        committed, so this waits for it and refreshes again rather than
+        returning early.
+        """
+        if not self.enabled or self._data is None:
+            return
+        self._dirty.set()
+        self.refresh()
+
+    def refresh(self, blocking: bool = True) -> None:
+        """Apply changed rows to a copy of the snapshot and publish it"""
+        if not self._refresh_lock.acquire(blocking=blocking):
+            # The running refresh sees the dirty flag and goes round again
+            return
+        try:
+            while True:
+                self._dirty.clear()
+                self._data = self._refreshed(self._data)
+                if not self._dirty.is_set():
+                    break
+        finally:
+            self._refresh_lock.release()
+
+    def _refreshed(self, current: Optional[_Columns]) -> _Columns:
+        table = CatalogEntity.__table__
+        stmt = select(*(table.c[name] for name in FIELDS))
+        if current is not None and current.watermark is not None:
+            stmt = stmt.where(table.c.updated_at > current.watermark - REFRESH_OVERLAP)
+
+        def fetch(session):
+            rows = session.execute(stmt).mappings().all()
+            count = session.execute(
+                select(func.count()).select_from(table)
+            ).scalar_one()
+            return rows, count
+
+        results = db_manager.fan_out(fetch)
+        data = current.copy() if current is not None else _Columns()
+        for rows, _ in results:
+            for row in rows:
+                updated_at = row["updated_at"]
+                data.upsert(
+                    {
+                        **row,
+                        "created_at": row["created_at"].isoformat(),
+                        "updated_at": updated_at.isoformat(),
+                    }
+                )
+                if data.watermark is None or updated_at > data.watermark:
+                    data.watermark = updated_at
+
+        # Deletes leave no updated_at trail; detect them by row count
+        total = sum(count for _, count in results)
+        if len(data) > total:
+            table_ids = select(table.c.id)
+            existing = set()
+            for ids in db_manager.fan_out(
+                lambda s: s.execute(table_ids).scalars().all()
+            ):
+                existing.update(ids)
+            for entity_id in [i for i in data.positions if i not in existing]:
+                data.remove(entity_id)
+
+        if len(data.alive) - len(data) > len(data) // 4:
+            data = data.compacted()
+        return data
+
+    def get(self, entity_id: int) -> Optional[Dict[str, Any]]:
+        """Return an entity's summary fields, or None if not in the snapshot"""
+        data = self._current()
+        position = data.positions.get(entity_id)
+        return data.row(position) if position is not None else None
+
+    def query(self, **filters: str) -> List[Dict[str, Any]]:
+        """Return entities matching all filters, newest created first"""
+        data = self._current()
+        if not filters:
+            return [data.row(position) for position in data.order()]
+
+        matches = None
+        for field, value in filters.items():
+            postings = set(data.lookup(field, value))
+            matches = postings if matches is None else matches & postings
+            if not matches:
+                return []
+        created = data.columns["created_at"]
+        positions = sorted(matches, key=lambda p: created[p], reverse=True)
+        return [data.row(position) for position in positions]
+
+
+# Create catalog snapshot instance
+catalog_snapshot = CatalogSnapshot()
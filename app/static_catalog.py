@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Optional
+import yaml
+from flask import Flask
+from sqlalchemy import func, select
+from app.database import db_manager
+from app.models import CatalogEntity
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rows are re-read from this far behind the newest updated_at seen, so a
+# transaction that committed late with an older timestamp is not missed
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def _write_atomic(path: Path, content: str) -> None:
+    """Replace path with content so readers see the old or new file, never a mix"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class StaticCatalog:
+    """Pre-rendered copy of the catalog on disk, served with send_file
+
+    Each entity has two files under DATA_DIR/static/entities: <id>.yaml,
+    the stored document, and <id>.json, the body of the download endpoint's
+    JSON response. catalog.yaml bundles every document. Writes re-render
+    only the rows changed since the last sync; the bundle is rebuilt from
+    the entity files, never from the database. Every file is replaced
+    atomically, so requests can stream it without locking.
+    """
+
+    def __init__(self, app: Flask = None):
+        self.enabled = False
+        self.refresh_interval = 5.0
+        self.root: Optional[Path] = None
+        self._versions: Optional[Dict[int, datetime]] = None
+        self._watermark: Optional[datetime] = None
+        self._bundle_stale = True
+        self._sync_lock = threading.Lock()
+        self._bundle_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """Read settings; files are rendered on first use"""
+        self.enabled = app.config.get("STATIC_CATALOG", False)
+        self.refresh_interval = app.config.get("STATIC_CATALOG_REFRESH_SECONDS", 5.0)
+        self.root = Path(app.config["DATA_DIR"]) / "static"
+        self._versions = None
+        self._watermark = None
+        self._bundle_stale = True
+
+    @property
+    def entity_dir(self) -> Path:
+        return self.root / "entities"
+
+    @property
+    def bundle_path(self) -> Path:
+        return self.root / "catalog.yaml"
+
+    def _ensure_loaded(self) -> None:
+        if self._versions is None:
+            self.sync()
+            self._start_refresher()
+
+    def _start_refresher(self) -> None:
+        with self._sync_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="static-catalog", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._dirty.wait(self.refresh_interval)
+            try:
+                self.sync()
+                if self._bundle_stale:
+                    self.build_bundle()
+            except Exception as e:
+                logger.error("Static catalog sync failed: %s", e)
+
+    def notify_write(self) -> None:
+        """Called after a committed write; renders it before the response is sent
+
+        A sync already running may have read the entity before the write
+        committed, so this waits for it and syncs again rather than
+        returning early.
+        """
+        if not self.enabled or self._versions is None:
+            return
+        self._dirty.set()
+        self.sync()
+
+    def sync(self, blocking: bool = True) -> None:
+        """Render entities changed since the last sync and remove deleted ones"""
+        if not self._sync_lock.acquire(blocking=blocking):
+            # The running sync sees the dirty flag and goes round again
+            return
+        try:
+            while True:
+                self._dirty.clear()
+                self._sync_once()
+                if not self._dirty.is_set():
+                    break
+        finally:
+            self._sync_lock.release()
+
+    def _sync_once(self) -> None:
+        self.entity_dir.mkdir(parents=True, exist_ok=True)
+        initial = self._versions is None
+        versions = {} if initial else dict(self._versions)
+
+        stmt = select(
+            CatalogEntity.id, CatalogEntity.entity_data, CatalogEntity.updated_at
+        )
+        if self._watermark is not None:
+            stmt = stmt.where(CatalogEntity.updated_at > self._watermark - SYNC_OVERLAP)
+
+        def fetch(session):
+            rows = session.execute(stmt).all()
+            count = session.execute(
+                select(func.count()).select_from(CatalogEntity)
+            ).scalar_one()
+            return rows, count
+
+        results = db_manager.fan_out(fetch)
+        watermark = self._watermark
+        changed = False
+        for rows, _ in results:
+            for entity_id, entity_data, updated_at in rows:
+                if watermark is None or updated_at > watermark:
+                    watermark = updated_at
+                if versions.get(entity_id) == updated_at:
+                    continue
+                if not (initial and self._is_current(entity_id, updated_at)):
+                    self._render(entity_id, entity_data)
+                versions[entity_id] = updated_at
+                changed = True
+
+        # Deletes leave no updated_at trail; detect them by row count, and on
+        # the first sync remove files left behind by a previous run
+        total = sum(count for _, count in results)
+        if initial or len(versions) > total:
+            existing = set()
+            for ids in db_manager.fan_out(
+                lambda s: s.execute(select(CatalogEntity.id)).scalars().all()
+            ):
+                existing.update(ids)
+            for entity_id in [i for i in versions if i not in existing]:
+                del versions[entity_id]
+                changed = True
+            for path in self.entity_dir.glob("*.*"):
+                if path.stem.isdigit() and int(path.stem) not in existing:
+                    path.unlink(missing_ok=True)
+
+        self._versions = versions
+        self._watermark = watermark
+        if changed or initial:
+            self._bundle_stale = True
+
+    def _is_current(self, entity_id: int, updated_at: datetime) -> bool:
+        """True if a previous run already rendered this version of the entity"""
+        timestamp = updated_at.replace(tzinfo=timezone.utc).timestamp()
+        for suffix in (".yaml", ".json"):
+            path = self.entity_dir / f"{entity_id}{suffix}"
+            if not path.exists() or path.stat().st_mtime < timestamp:
+                return False
+        return True
+
+    def _render(self, entity_id: int, entity_data: str) -> None:
+        # Same body the download endpoint's JSON response has always had
+        body = json.dumps(
+            {"status": "success", "data": yaml.safe_load(entity_data)},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        _write_atomic(self.entity_dir / f"{entity_id}.yaml", entity_data)
+        _write_atomic(self.entity_dir / f"{entity_id}.json", body + "\n")
+
+    def build_bundle(self) -> None:
+        """Concatenate the entity documents, in id order, into catalog.yaml"""
+        with self._bundle_lock:
+            if not self._bundle_stale:
+                return
+            # Cleared first: a write during the build marks it stale again
+            self._bundle_stale = False
+            parts = []
+            for entity_id in sorted(self._versions):
+                try:
+                    document = (self.entity_dir / f"{entity_id}.yaml").read_text(
+                        encoding="utf-8"
+                    )
+                except FileNotFoundError:
+                    # Deleted since the last sync
+                    continue
+                parts.append("---\n")
+                parts.append(document)
+            _write_atomic(self.bundle_path, "".join(parts))
+
+    def entity_file(self, entity_id: int, file_format: str) -> Optional[Path]:
+        """Path of an entity's rendered file, or None if it has none"""
+        self._ensure_loaded()
+        if entity_id not in self._versions:
+            return None
+        path = self.entity_dir / f"{entity_id}.{file_format}"
+        return path if path.exists() else None
+
+    def bundle(self) -> Path:
+        """Path of the full-catalog bundle, rebuilt first if writes made it stale"""
+        self._ensure_loaded()
+        if self._bundle_stale or not self.bundle_path.exists():
+            self._bundle_stale = True
+            self.build_bundle()
+        return self.bundle_path
+
+
+# Create static catalog instance
+static_catalog = StaticCatalog()
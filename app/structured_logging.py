@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+import atexit
+import json
+import logging
+import queue
+import random
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Optional
+from flask import Flask, g, has_request_context, request
+from flask.logging import default_handler
+from sqlalchemy import Engine, event
+
+# SQL statements run for the current request. A list rather than a counter
+# so shard fan-out threads, which run in a copy of the context, append to it.
+_sql_statements: ContextVar[Optional[list]] = ContextVar("sql_statements", default=None)
+
+# Request attributes copied onto records and written as JSON fields
+REQUEST_FIELDS = ("request_id", "method", "route", "status", "latency_ms", "sql_count")
+
+access_logger = logging.getLogger("app.access")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    statements = _sql_statements.get()
+    if statements is not None:
+        statements.append(None)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in REQUEST_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class AsyncQueueHandler(QueueHandler):
+    """Hands records to a background listener without formatting them
+
+    The stock QueueHandler formats each record on the calling thread; here
+    the message and its arguments stay lazy until the listener writes them.
+    Per-request INFO records are sampled, and records are dropped rather
+    than blocking if the queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue, sample_rate: float = 1.0):
+        super().__init__(log_queue)
+        self.sample_rate = sample_rate
+        self.dropped = 0
+        self.listener: Optional[QueueListener] = None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if (
+            self.sample_rate < 1.0
+            and record.levelno <= logging.INFO
+            and has_request_context()
+            and random.random() >= self.sample_rate
+        ):
+            return False
+        return super().filter(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Request context is only available on this thread, so capture it now
+        if has_request_context():
+            if getattr(record, "request_id", None) is None:
+                record.request_id = g.get("request_id")
+            if getattr(record, "route", None) is None:
+                rule = request.url_rule
+                record.method = request.method
+                record.route = rule.rule if rule is not None else request.path
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _before_request() -> None:
+    g.request_id = request.headers.get("X-Request-Id") or uuid.uuid4().hex
+    g.request_started = time.perf_counter()
+    g.sql_statements_token = _sql_statements.set([])
+
+
+def _after_request(response):
+    if "request_id" not in g:
+        return response
+    statements = _sql_statements.get()
+    rule = request.url_rule
+    access_logger.info(
+        "%s %s %s",
+        request.method,
+        request.path,
+        response.status_code,
+        extra={
+            "request_id": g.request_id,
+            "method": request.method,
+            "route": rule.rule if rule is not None else request.path,
+            "status": response.status_code,
+            "latency_ms": round((time.perf_counter() - g.request_started) * 1000, 3),
+            "sql_count": len(statements) if statements is not None else 0,
+        },
+    )
+    response.headers["X-Request-Id"] = g.request_id
+    return response
+
+
+def _teardown_request(exception=None) -> None:
+    token = g.pop("sql_statements_token", None)
+    if token is not None:
+        _sql_statements.reset(token)
+
+
+def init_app(app: Flask, log_dir: Path) -> None:
+    """Route the app's logs through a queue to a background writer thread
+
+    Records go to a rotating JSON log file and to the console. Every request
+    gets an id (X-Request-Id) and an access record with route, status,
+    latency and SQL statement count.
+    """
+    logger = app.logger
+
+    # Replace handlers from a previous create_app() in this process
+    for handler in list(logger.handlers):
+        if isinstance(handler, AsyncQueueHandler):
+            logger.removeHandler(handler)
+            atexit.unregister(handler.listener.stop)
+            handler.listener.stop()
+    logger.removeHandler(default_handler)
+
+    # The log file is opened on first write
+    file_handler = RotatingFileHandler(
+        log_dir / "catalog_manager.log",
+        maxBytes=10240000,  # 10MB
+        backupCount=10,
+        delay=True,
+    )
+    file_handler.setFormatter(JsonFormatter())
+    file_handler.setLevel(logging.INFO)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(default_handler.formatter)
+
+    log_queue = queue.Queue(maxsize=app.config.get("LOG_QUEUE_SIZE", 10000))
+    queue_handler = AsyncQueueHandler(
+        log_queue, sample_rate=app.config.get("LOG_SAMPLE_RATE", 1.0)
+    )
+    queue_handler.listener = QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    queue_handler.listener.start()
+    atexit.register(queue_handler.listener.stop)
+
+    logger.addHandler(queue_handler)
+    logger.setLevel(logging.INFO)
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
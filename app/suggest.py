@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+import bisect
+import heapq
+import logging
+import threading
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from flask import Flask
+from sqlalchemy import func, select
+from app.database import db_manager
+from app.models import CatalogEntity
+
+logger = logging.getLogger(__name__)
+
+# Entity columns that can be autocompleted
+SUGGEST_FIELDS = ("owner", "system", "name")
+
+# Prefixes matching at least this many values have their ranking cached
+# until the index next changes, so short prefixes stay cheap
+CACHE_MIN_CANDIDATES = 1000
+
+
+class _PrefixIndex:
+    """Distinct values of one field, sorted case-insensitively, with counts"""
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.values: List[str] = []
+        self.counts: Dict[str, int] = {}
+        self._cache: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+
+    def add(self, value: str, count: int = 1) -> None:
+        self._cache.clear()
+        if value in self.counts:
+            self.counts[value] += count
+            return
+        key = value.casefold()
+        position = bisect.bisect_left(self.keys, key)
+        # Equal keys differing only in case sort by the original value
+        while position < len(self.keys) and self.keys[position] == key:
+            if self.values[position] > value:
+                break
+            position += 1
+        self.keys.insert(position, key)
+        self.values.insert(position, value)
+        self.counts[value] = count
+
+    def discard(self, value: str) -> None:
+        count = self.counts.get(value)
+        if count is None:
+            return
+        self._cache.clear()
+        if count > 1:
+            self.counts[value] = count - 1
+            return
+        del self.counts[value]
+        key = value.casefold()
+        position = bisect.bisect_left(self.keys, key)
+        while self.values[position] != value:
+            position += 1
+        del self.keys[position]
+        del self.values[position]
+
+    def search(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        """Most frequent values starting with prefix, ties broken alphabetically"""
+        key = prefix.casefold()
+        cached = self._cache.get((key, limit))
+        if cached is not None:
+            return cached
+        # Values sharing the prefix are contiguous; find where they stop
+        start = bisect.bisect_left(self.keys, key)
+        end = bisect.bisect_left(self.keys, key + "\U0010ffff", start)
+        best = heapq.nsmallest(
+            limit,
+            range(start, end),
+            key=lambda p: (-self.counts[self.values[p]], self.keys[p]),
+        )
+        result = [
+            {"value": self.values[p], "count": self.counts[self.values[p]]}
+            for p in best
+        ]
+        if end - start >= CACHE_MIN_CANDIDATES:
+            self._cache[(key, limit)] = result
+        return result
+
+
+class SuggestionIndex:
+    """In-memory prefix indexes for typeahead on entity fields
+
+    The indexes are built on first use with one GROUP BY per field and are
+    then kept current by apply(), which the write paths call once their
+    change has been committed. Each process keeps its own index, so a
+    background thread also rebuilds it every refresh_interval seconds to
+    pick up writes made by other workers.
+    """
+
+    def __init__(self, app: Flask = None):
+        self.default_limit = 10
+        self.refresh_interval = 30.0
+        self._indexes: Optional[Dict[str, _PrefixIndex]] = None
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._rebuilding = False
+        self._dirty = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """Read settings and drop any index built for a previous app"""
+        self.default_limit = app.config.get("SUGGEST_LIMIT", 10)
+        self.refresh_interval = app.config.get("SUGGEST_REFRESH_SECONDS", 30.0)
+        with self._lock:
+            self._indexes = None
+
+    def _load(self) -> Dict[str, _PrefixIndex]:
+        indexes = {}
+        for field in SUGGEST_FIELDS:
+            column = getattr(CatalogEntity, field)
+            stmt = (
+                select(column, func.count()).where(column.is_not(None)).group_by(column)
+            )
+            index = _PrefixIndex()
+            for rows in db_manager.fan_out(lambda s: s.execute(stmt).all()):
+                for value, count in rows:
+                    index.add(value, count)
+            indexes[field] = index
+        return indexes
+
+    def _start_refresher(self) -> None:
+        with self._rebuild_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="suggestion-index", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._dirty.wait(self.refresh_interval)
+            try:
+                self.rebuild()
+            except Exception as e:
+                logger.error("Suggestion index rebuild failed: %s", e)
+
+    def rebuild(self) -> None:
+        """Load the indexes from the database and swap them in"""
+        with self._rebuild_lock:
+            with self._lock:
+                self._rebuilding = True
+            self._dirty.clear()
+            try:
+                indexes = self._load()
+            finally:
+                with self._lock:
+                    self._rebuilding = False
+            with self._lock:
+                self._indexes = indexes
+        # A write applied during the load may be missing from the new
+        # indexes; in that case apply() has set the dirty flag and the
+        # refresher rebuilds again straight away
+
+    def search(
+        self, field: str, prefix: str, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Return up to limit {'value', 'count'} suggestions for a field"""
+        with self._lock:
+            indexes = self._indexes
+            if indexes is not None:
+                return indexes[field].search(prefix, limit or self.default_limit)
+        self.rebuild()
+        self._start_refresher()
+        with self._lock:
+            return self._indexes[field].search(prefix, limit or self.default_limit)
+
+    def apply(
+        self,
+        before: Optional[Mapping[str, Any]],
+        after: Optional[Mapping[str, Any]],
+    ) -> None:
+        """Apply one committed entity write
+
+        before and after are the entity's field values around the write;
+        None stands for a created or deleted entity.
+        """
+        with self._lock:
+            if self._rebuilding:
+                self._dirty.set()
+            if self._indexes is None:
+                # Not built yet; the first search loads committed values
+                return
+            for field in SUGGEST_FIELDS:
+                old = before.get(field) if before else None
+                new = after.get(field) if after else None
+                if old == new:
+                    continue
+                if old is not None:
+                    self._indexes[field].discard(old)
+                if new is not None:
+                    self._indexes[field].add(new)
+
+
+# Create suggestion index instance
+suggestion_index = SuggestionIndex()
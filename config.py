@@ -8,19 +8,79 @@ class Config:
     # Get the base directory of the application
     BASE_DIR = Path(__file__).resolve().parent
 
-    # Create a data directory if it doesn't exist
-    DATA_DIR = BASE_DIR / "data"
-    DATA_DIR.mkdir(exist_ok=True)
+    # Data directory; created by create_app() rather than at import time
+    DATA_DIR = Path(os.environ.get("CATALOG_DATA_DIR") or BASE_DIR / "data")
 
     # Database configuration
     SQLITE_DB_PATH = DATA_DIR / "catalog.db"
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{SQLITE_DB_PATH}"
 
+    # Namespace sharding: number of SQLite shard files, 0 disables sharding
+    CATALOG_SHARDS = int(os.environ.get("CATALOG_SHARDS", "0"))
+    SHARD_DIR = DATA_DIR / "shards"
+
+    # Serve list/get reads from an in-memory snapshot refreshed after writes
+    CATALOG_SNAPSHOT = os.environ.get("CATALOG_SNAPSHOT", "0") == "1"
+    SNAPSHOT_REFRESH_SECONDS = float(os.environ.get("SNAPSHOT_REFRESH_SECONDS", "1.0"))
+
+    # Serve downloads and exports from files pre-rendered under DATA_DIR/static,
+    # re-rendered after writes; STATIC_CATALOG_MAX_AGE is the Cache-Control
+    # max-age for them (0 means clients revalidate with ETag/Last-Modified)
+    STATIC_CATALOG = os.environ.get("STATIC_CATALOG", "0") == "1"
+    STATIC_CATALOG_REFRESH_SECONDS = float(
+        os.environ.get("STATIC_CATALOG_REFRESH_SECONDS", "5.0")
+    )
+    STATIC_CATALOG_MAX_AGE = int(os.environ.get("STATIC_CATALOG_MAX_AGE", "0"))
+    # Let a fronting nginx/Apache send files (X-Sendfile) instead of the app
+    USE_X_SENDFILE = os.environ.get("USE_X_SENDFILE", "0") == "1"
+
+    # Admission control for /api requests: per-process concurrency budgets
+    # with bounded wait queues (shed with 503), and per-client token buckets
+    ADMISSION_CONTROL = os.environ.get("ADMISSION_CONTROL", "0") == "1"
+    ADMISSION_READ_LIMIT = int(os.environ.get("ADMISSION_READ_LIMIT", "32"))
+    ADMISSION_READ_QUEUE = int(os.environ.get("ADMISSION_READ_QUEUE", "64"))
+    ADMISSION_WRITE_LIMIT = int(os.environ.get("ADMISSION_WRITE_LIMIT", "4"))
+    ADMISSION_WRITE_QUEUE = int(os.environ.get("ADMISSION_WRITE_QUEUE", "16"))
+    ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "2.0"))
+    ADMISSION_RETRY_AFTER = int(os.environ.get("ADMISSION_RETRY_AFTER", "1"))
+    # Per-client tokens per second; 0 disables rate limiting
+    ADMISSION_CLIENT_RATE = float(os.environ.get("ADMISSION_CLIENT_RATE", "0"))
+    ADMISSION_CLIENT_BURST = float(os.environ.get("ADMISSION_CLIENT_BURST", "20"))
+
+    # Logging: fraction of per-request INFO records kept, and the bound on
+    # records waiting for the background writer (extra records are dropped)
+    LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "1.0"))
+    LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+
+    # Entity revision history stores a full document every this many
+    # revisions and compressed diffs in between
+    REVISION_SNAPSHOT_INTERVAL = int(os.environ.get("REVISION_SNAPSHOT_INTERVAL", "20"))
+
+    # Largest number of ids or refs accepted by POST /api/entity/batch-get
+    BATCH_GET_LIMIT = int(os.environ.get("BATCH_GET_LIMIT", "100"))
+
+    # Default number of values returned by GET /api/suggest
+    SUGGEST_LIMIT = int(os.environ.get("SUGGEST_LIMIT", "10"))
+
+    # Seconds between rebuilds of each process's suggestion index, which
+    # pick up values written by other workers
+    SUGGEST_REFRESH_SECONDS = float(os.environ.get("SUGGEST_REFRESH_SECONDS", "30"))
+
+    # Background jobs: worker threads, the most jobs queued or running per
+    # process, and how often running jobs save their progress (seconds)
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+    JOB_QUEUE_LIMIT = int(os.environ.get("JOB_QUEUE_LIMIT", "16"))
+    JOB_PROGRESS_INTERVAL = float(os.environ.get("JOB_PROGRESS_INTERVAL", "1.0"))
+
     # SQLAlchemy configuration
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": 10,
+        "max_overflow": 20,
+        # Fail fast rather than queueing on the pool behind SQLite's write lock
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", "5")),
         "pool_pre_ping": True,
-        "pool_recycle": 300,
+        "pool_recycle": 3600,
     }
 
     # Flask configuration
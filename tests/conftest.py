@@ -0,0 +1,36 @@
+import pytest
+import yaml
+from pathlib import Path
+from config import Config
+from app import create_app
+
+EXAMPLE = Path(__file__).resolve().parent.parent / "examples" / "simple.yaml"
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Return a factory creating an app on a temporary data directory
+
+    Keyword arguments override Config settings.
+    """
+
+    def make(**settings):
+        defaults = {
+            "DATA_DIR": tmp_path,
+            "SQLITE_DB_PATH": tmp_path / "catalog.db",
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'catalog.db'}",
+            "SHARD_DIR": tmp_path / "shards",
+            "CATALOG_SHARDS": 0,
+            "CATALOG_SNAPSHOT": False,
+            "STATIC_CATALOG": False,
+            "ADMISSION_CONTROL": False,
+        }
+        return create_app(type("TestConfig", (Config,), {**defaults, **settings}))
+
+    return make
+
+
+@pytest.fixture
+def document():
+    """The example entity document"""
+    return yaml.safe_load(EXAMPLE.read_text())
@@ -0,0 +1,37 @@
+def test_aliases_of_one_entity_are_all_matched(make_app, document):
+    client = make_app().test_client()
+    entity_id = client.post("/api/entity", json=document).json["entity"]["id"]
+    kind = document["kind"]
+    namespace = document["metadata"]["namespace"]
+    name = document["metadata"]["name"]
+    items = [
+        f"{kind}:{namespace}/{name}",
+        f"{kind.lower()}:{namespace}/{name}",
+        f"{namespace}/{name}",
+        entity_id,
+        "component:default/does-not-exist",
+    ]
+
+    response = client.post("/api/entity/batch-get", json={"ids": items})
+
+    assert response.status_code == 200
+    assert [entity["id"] for entity in response.json["entities"]] == [entity_id]
+    assert response.json["missing"] == ["component:default/does-not-exist"]
+
+
+def test_entities_follow_request_order(make_app, document):
+    client = make_app().test_client()
+    first = client.post("/api/entity", json=document).json["entity"]
+    document["metadata"]["name"] = "second"
+    second = client.post("/api/entity", json=document).json["entity"]
+
+    response = client.post(
+        "/api/entity/batch-get",
+        json={"ids": [f"{second['namespace']}/second", first["id"], second["id"]]},
+    )
+
+    assert [entity["id"] for entity in response.json["entities"]] == [
+        second["id"],
+        first["id"],
+    ]
+    assert response.json["missing"] == []
@@ -0,0 +1,52 @@
+import json
+import time
+import yaml
+
+
+def run_job(client, job_type, params):
+    """Submit a job and return its record once it has finished"""
+    response = client.post("/api/jobs", json={"type": job_type, "params": params})
+    assert response.status_code == 202
+    job_id = response.json["job"]["id"]
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/jobs/{job_id}").json["job"]
+        if job["status"] in ("succeeded", "failed", "cancelled"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_json_export_encodes_dates(make_app, document):
+    client = make_app().test_client()
+    document["spec"]["since"] = "2024-01-01"
+    # Unquoted in YAML, so the stored document holds a date
+    source = yaml.dump(document).replace("'2024-01-01'", "2024-01-01")
+    imported = run_job(client, "import", {"yaml": source})
+    assert imported["result"]["created"] == 1
+
+    job = run_job(client, "export", {"format": "json"})
+    assert job["status"] == "succeeded", job["error"]
+    exported = json.loads(client.get(f"/api/jobs/{job['id']}/download").data)
+    assert exported[0]["spec"]["since"] == "2024-01-01"
+
+    job = run_job(client, "export", {"format": "yaml"})
+    assert job["status"] == "succeeded", job["error"]
+    exported = yaml.safe_load(client.get(f"/api/jobs/{job['id']}/download").data)
+    assert str(exported["spec"]["since"]) == "2024-01-01"
+
+
+def test_import_reports_non_string_fields(make_app, document):
+    client = make_app().test_client()
+    bad_kind = dict(document, kind=["x"])
+    bad_owner = dict(document, metadata=dict(document["metadata"], owner={"a": 1}))
+    good = dict(document, metadata=dict(document["metadata"], name="imported"))
+    job = run_job(client, "import", {"documents": [bad_kind, bad_owner, good]})
+
+    assert job["status"] == "succeeded", job["error"]
+    assert job["result"]["created"] == 1
+    assert job["result"]["invalid"] == 2
+    assert job["result"]["errors"] == [
+        {"index": 0, "errors": ["Invalid field type: kind must be a string"]},
+        {"index": 1, "errors": ["Invalid field type: metadata.owner must be a string"]},
+    ]
@@ -0,0 +1,54 @@
+from app.patch import apply_merge_patch, patch_touches
+
+
+def test_null_removes_member():
+    target = {"a": 1, "b": 2}
+    assert apply_merge_patch(target, {"a": None}) == {"b": 2}
+
+
+def test_null_for_missing_member_is_ignored():
+    assert apply_merge_patch({"a": 1}, {"b": None}) == {"a": 1}
+
+
+def test_nested_objects_are_merged():
+    target = {"metadata": {"name": "svc", "owner": "team-a", "tags": ["x"]}}
+    patch = {"metadata": {"owner": "team-b", "tags": None}}
+    assert apply_merge_patch(target, patch) == {
+        "metadata": {"name": "svc", "owner": "team-b"}
+    }
+
+
+def test_arrays_and_scalars_are_replaced():
+    target = {"tags": ["a", "b"], "spec": {"type": "service"}}
+    patch = {"tags": ["c"], "spec": "replaced"}
+    assert apply_merge_patch(target, patch) == {"tags": ["c"], "spec": "replaced"}
+
+
+def test_object_patch_replaces_non_object_target():
+    assert apply_merge_patch({"a": "text"}, {"a": {"b": "c"}}) == {"a": {"b": "c"}}
+    assert apply_merge_patch(["a"], {"b": "c"}) == {"b": "c"}
+
+
+def test_non_object_patch_replaces_target():
+    assert apply_merge_patch({"a": 1}, ["x"]) == ["x"]
+    assert apply_merge_patch({"a": 1}, "x") == "x"
+
+
+def test_nulls_inside_new_members_are_dropped():
+    assert apply_merge_patch({}, {"a": {"b": None, "c": 1}}) == {"a": {"c": 1}}
+
+
+def test_target_is_not_modified():
+    target = {"metadata": {"owner": "team-a"}}
+    apply_merge_patch(target, {"metadata": {"owner": None}})
+    assert target == {"metadata": {"owner": "team-a"}}
+
+
+def test_patch_touches():
+    patch = {"metadata": {"owner": "team-b"}}
+    assert patch_touches(patch, ["metadata", "owner"])
+    assert patch_touches(patch, ["metadata"])
+    assert not patch_touches(patch, ["metadata", "namespace"])
+    assert not patch_touches(patch, ["spec"])
+    # Replacing a parent may change anything below it
+    assert patch_touches({"metadata": None}, ["metadata", "namespace"])
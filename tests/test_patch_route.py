@@ -0,0 +1,43 @@
+import pytest
+
+MERGE_PATCH = "application/merge-patch+json"
+
+
+@pytest.mark.parametrize(
+    "patch, error",
+    [
+        ({"metadata": {"owner": {"a": 1}}}, "metadata.owner must be a string"),
+        ({"metadata": {"name": ["x"]}}, "metadata.name must be a string"),
+        ({"kind": 7}, "kind must be a string"),
+        ({"spec": {"system": None}}, "Missing required field: spec.system"),
+        ({"metadata": {"title": {"a": 1}}}, "metadata.title must be a string"),
+    ],
+)
+def test_invalid_patch_is_rejected(make_app, document, patch, error):
+    client = make_app().test_client()
+    entity = client.post("/api/entity", json=document).json["entity"]
+
+    response = client.patch(
+        f"/api/entity/{entity['id']}", json=patch, content_type=MERGE_PATCH
+    )
+
+    assert response.status_code == 400
+    assert response.json["type"] == "validation_error"
+    assert any(error in message for message in response.json["errors"])
+    assert client.get(f"/api/entity/{entity['id']}").json["entity"] == entity
+
+
+def test_optional_fields_can_be_removed(make_app, document):
+    client = make_app().test_client()
+    document["metadata"]["title"] = "Pet store"
+    entity_id = client.post("/api/entity", json=document).json["entity"]["id"]
+
+    response = client.patch(
+        f"/api/entity/{entity_id}",
+        json={"metadata": {"title": None, "owner": "team-b"}},
+        content_type=MERGE_PATCH,
+    )
+
+    assert response.status_code == 200
+    assert response.json["entity"]["title"] is None
+    assert response.json["entity"]["owner"] == "team-b"
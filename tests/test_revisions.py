@@ -0,0 +1,94 @@
+import copy
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import InvalidRequestError
+from app.database import db_manager
+from app.models import CatalogEntity, EntityRevision
+from app.revisions import apply_delta, list_revisions, load_revision, make_delta
+
+OLD = "apiVersion: v1\nkind: Component\nmetadata:\n  name: a\n  owner: x\n"
+
+
+@pytest.mark.parametrize(
+    "new",
+    [
+        OLD,
+        OLD.replace("owner: x", "owner: y"),
+        "header: 1\n" + OLD + "spec:\n  type: service\n",
+        "kind: Component\nmetadata:\n  name: a\n",
+        "",
+        OLD.rstrip("\n"),
+    ],
+)
+def test_apply_delta_reconstructs_new_text(new):
+    assert apply_delta(OLD, make_delta(OLD, new)) == new
+
+
+def test_unchanged_text_has_empty_delta():
+    assert make_delta(OLD, OLD) == []
+
+
+def test_delta_only_holds_changed_lines():
+    delta = make_delta(OLD, OLD.replace("owner: x", "owner: y"))
+    assert delta == [[4, 5, ["  owner: y\n"]]]
+
+
+def test_load_revision_across_snapshots(make_app, document):
+    app = make_app(REVISION_SNAPSHOT_INTERVAL=3)
+    client = app.test_client()
+    entity_id = client.post("/api/entity", json=document).json["entity"]["id"]
+
+    texts = {}
+    with app.app_context(), db_manager.session_scope() as session:
+        texts[1] = session.get(CatalogEntity, entity_id).entity_data
+    for revision in range(2, 9):
+        document = copy.deepcopy(document)
+        document["metadata"]["owner"] = f"team-{revision}"
+        document["metadata"].setdefault("tags", []).append(f"tag-{revision}")
+        response = client.put(f"/api/entity/{entity_id}", json=document)
+        assert response.status_code == 200
+        with app.app_context(), db_manager.session_scope() as session:
+            texts[revision] = session.get(CatalogEntity, entity_id).entity_data
+
+    with app.app_context(), db_manager.session_scope() as session:
+        snapshots = (
+            session.execute(
+                select(EntityRevision.revision)
+                .where(
+                    EntityRevision.entity_id == entity_id, EntityRevision.is_snapshot
+                )
+                .order_by(EntityRevision.revision)
+            )
+            .scalars()
+            .all()
+        )
+        assert snapshots == [1, 4, 7]
+
+        for revision, text in texts.items():
+            assert load_revision(session, entity_id, revision) == text
+        assert load_revision(session, entity_id, 9) is None
+        assert load_revision(session, entity_id + 1, 1) is None
+
+
+def test_history_reports_sizes_without_loading_data(make_app, document):
+    app = make_app()
+    client = app.test_client()
+    entity_id = client.post("/api/entity", json=document).json["entity"]["id"]
+    document["metadata"]["owner"] = "team-b"
+    client.put(f"/api/entity/{entity_id}", json=document)
+
+    history = client.get(f"/api/entity/{entity_id}/revisions").json["revisions"]
+
+    with app.app_context(), db_manager.session_scope() as session:
+        stored = session.execute(
+            select(EntityRevision.revision, EntityRevision.data)
+            .where(EntityRevision.entity_id == entity_id)
+            .order_by(EntityRevision.revision.desc())
+        ).all()
+        assert [(r["revision"], r["stored_bytes"]) for r in history] == [
+            (revision, len(data)) for revision, data in stored
+        ]
+
+        revisions = list_revisions(session, entity_id)
+        with pytest.raises(InvalidRequestError):
+            revisions[0].data
@@ -0,0 +1,75 @@
+import pytest
+from app.sharding import HashRing, ShardMap, ID_STRIDE
+
+NAMESPACES = [f"team-{index}" for index in range(500)]
+
+
+def test_ring_is_deterministic():
+    ring = HashRing(["a", "b", "c"])
+    again = HashRing(["c", "a", "b"])
+    assert [ring.node_for(key) for key in NAMESPACES] == [
+        again.node_for(key) for key in NAMESPACES
+    ]
+
+
+def test_ring_uses_every_node():
+    ring = HashRing(["a", "b", "c"])
+    assert {ring.node_for(key) for key in NAMESPACES} == {"a", "b", "c"}
+
+
+def test_adding_a_node_only_moves_keys_to_it():
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b", "c", "d"])
+    moved = [key for key in NAMESPACES if before.node_for(key) != after.node_for(key)]
+    assert moved
+    assert all(after.node_for(key) == "d" for key in moved)
+    assert len(moved) < len(NAMESPACES) / 2
+
+
+def test_empty_ring_raises():
+    with pytest.raises(ValueError):
+        HashRing([]).node_for("team")
+
+
+def test_overrides_pin_namespaces():
+    shard_map = ShardMap.with_shard_count(4)
+    unpinned = shard_map.shard_for("big-team")
+    target = next(shard for shard in shard_map.shards if shard != unpinned)
+    pinned = ShardMap(shard_map.shards, {"big-team": target})
+    assert pinned.shard_for("big-team") == target
+    assert pinned.shard_for("other") == shard_map.shard_for("other")
+
+
+def test_home_shard_decodes_entity_ids():
+    shard_map = ShardMap.with_shard_count(3)
+    for shard in shard_map.shards:
+        index = shard_map.index_of(shard)
+        for sequence in (1, 2, 1000):
+            assert shard_map.home_shard(sequence * ID_STRIDE + index) == shard
+
+
+def test_home_shard_of_unknown_index_is_none():
+    shard_map = ShardMap.with_shard_count(2)
+    assert shard_map.home_shard(5 * ID_STRIDE + 2) is None
+    # Ids from an unsharded database need not follow the scheme
+    assert shard_map.home_shard(ID_STRIDE - 1) is None
+
+
+def test_shard_count_limits():
+    with pytest.raises(ValueError):
+        ShardMap([])
+    with pytest.raises(ValueError):
+        ShardMap.with_shard_count(ID_STRIDE + 1)
+
+
+def test_save_and_load(tmp_path):
+    path = tmp_path / "shards" / "shard_map.json"
+    shard_map = ShardMap(["shard-00", "shard-01"], {"big-team": "shard-01"})
+    shard_map.save(path)
+    loaded = ShardMap.load(path)
+    assert loaded.shards == shard_map.shards
+    assert loaded.overrides == shard_map.overrides
+    assert [loaded.shard_for(key) for key in NAMESPACES] == [
+        shard_map.shard_for(key) for key in NAMESPACES
+    ]
+    assert list(path.parent.iterdir()) == [path]
@@ -0,0 +1,147 @@
+from app.snapshot import FIELDS, _Columns
+
+
+def make_row(entity_id, **fields):
+    row = {name: f"{name}-{entity_id}" for name in FIELDS}
+    row.update(
+        id=entity_id,
+        kind="Component",
+        owner="team-a",
+        namespace="default",
+        system="shop",
+        lifecycle="production",
+        created_at=f"2024-01-{entity_id:02d}T00:00:00",
+    )
+    row.update(fields)
+    return row
+
+
+def lookup(data, field, value):
+    return sorted(data.ids[position] for position in data.lookup(field, value))
+
+
+def test_upsert_adds_and_updates_rows():
+    data = _Columns()
+    data.upsert(make_row(1))
+    data.upsert(make_row(2, owner="team-b"))
+    assert data.row(data.positions[2]) == make_row(2, owner="team-b")
+    assert lookup(data, "owner", "team-a") == [1]
+
+    data.upsert(make_row(1, owner="team-b", title="renamed"))
+    assert len(data) == 2
+    assert data.row(data.positions[1])["title"] == "renamed"
+    assert lookup(data, "owner", "team-b") == [1, 2]
+    assert lookup(data, "owner", "team-a") == []
+
+
+def test_encoded_values_are_shared():
+    data = _Columns()
+    for entity_id in range(1, 11):
+        data.upsert(make_row(entity_id))
+    assert data.codes["kind"].typecode == "I"
+    assert set(data.codes["kind"]) == {data.table.codes["Component"]}
+    assert data.table.values.count("Component") == 1
+
+
+def test_copy_leaves_published_version_unchanged():
+    old = _Columns()
+    old.upsert(make_row(1))
+    old.upsert(make_row(2))
+
+    new = old.copy()
+    new.upsert(make_row(1, owner="team-b"))
+    new.remove(2)
+    new.upsert(make_row(3))
+
+    assert old.row(old.positions[1]) == make_row(1)
+    assert sorted(old.positions) == [1, 2]
+    assert lookup(old, "owner", "team-a") == [1, 2]
+    assert lookup(old, "owner", "team-b") == []
+    assert lookup(new, "owner", "team-a") == [3]
+    assert lookup(new, "owner", "team-b") == [1]
+
+
+def test_remove_tombstones_row():
+    data = _Columns()
+    data.upsert(make_row(1))
+    data.upsert(make_row(2))
+    data.remove(1)
+    assert len(data) == 1
+    assert list(data.alive) == [0, 1]
+    assert lookup(data, "kind", "Component") == [2]
+    assert data.order() == [data.positions[2]]
+
+
+def test_compaction_drops_tombstones_and_unused_values():
+    data = _Columns()
+    for entity_id in range(1, 5):
+        data.upsert(make_row(entity_id, owner=f"team-{entity_id}"))
+    data.remove(1)
+    data.remove(3)
+    data.watermark = "mark"
+
+    compacted = data.compacted()
+
+    assert len(compacted.alive) == len(compacted) == 2
+    assert [compacted.row(p) for p in compacted.order()] == [
+        make_row(4, owner="team-4"),
+        make_row(2, owner="team-2"),
+    ]
+    assert "team-1" not in compacted.table.codes
+    assert lookup(compacted, "owner", "team-2") == [2]
+    assert compacted.watermark == "mark"
+
+
+def test_query_filters(make_app, document):
+    app = make_app(CATALOG_SNAPSHOT=True)
+    client = app.test_client()
+    created = []
+    for name, owner, system in [
+        ("a", "team-a", "shop"),
+        ("b", "team-b", "shop"),
+        ("c", "team-a", "billing"),
+    ]:
+        document["metadata"].update(name=name, owner=owner)
+        document["spec"]["system"] = system
+        created.append(client.post("/api/entity", json=document).json["entity"])
+
+    def names(**filters):
+        response = client.get("/api/entity", query_string=filters)
+        return [entity["name"] for entity in response.json["entities"]]
+
+    assert names() == ["c", "b", "a"]
+    assert names(owner="team-a") == ["c", "a"]
+    assert names(owner="team-a", system="shop") == ["a"]
+    assert names(owner="nobody") == []
+
+    client.delete(f"/api/entity/{created[2]['id']}")
+    client.patch(
+        f"/api/entity/{created[1]['id']}",
+        json={"metadata": {"owner": "team-a"}},
+        content_type="application/merge-patch+json",
+    )
+    assert names(owner="team-a") == ["b", "a"]
+    assert names(system="billing") == []
+    assert client.get(f"/api/entity/{created[0]['id']}").json["entity"] == created[0]
+
+
+def test_read_after_write_sees_the_write(make_app, document):
+    # A short refresh interval keeps the background refresh busy, which is
+    # when a write used to return before the snapshot had applied it
+    app = make_app(CATALOG_SNAPSHOT=True, SNAPSHOT_REFRESH_SECONDS=0.0005)
+    client = app.test_client()
+    entity_id = client.post("/api/entity", json=document).json["entity"]["id"]
+    assert client.get("/api/entity").status_code == 200
+
+    for attempt in range(200):
+        owner = f"team-{attempt}"
+        response = client.patch(
+            f"/api/entity/{entity_id}",
+            json={"metadata": {"owner": owner}},
+            content_type="application/merge-patch+json",
+        )
+        assert response.status_code == 200
+        assert client.get(f"/api/entity/{entity_id}").json["entity"]["owner"] == owner
+        assert [e["owner"] for e in client.get("/api/entity").json["entities"]] == [
+            owner
+        ]
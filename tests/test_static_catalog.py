@@ -0,0 +1,34 @@
+import yaml
+
+
+def test_download_after_write_returns_new_document(make_app, document):
+    # A short refresh interval keeps the background sync busy, which is
+    # when a write used to skip rendering its files
+    app = make_app(STATIC_CATALOG=True, STATIC_CATALOG_REFRESH_SECONDS=0.001)
+    client = app.test_client()
+    entity_id = client.post("/api/entity", json=document).json["entity"]["id"]
+    assert client.get(f"/api/entity/{entity_id}/download").status_code == 200
+
+    for attempt in range(50):
+        owner = f"team-{attempt}"
+        response = client.patch(
+            f"/api/entity/{entity_id}",
+            json={"metadata": {"owner": owner}},
+            content_type="application/merge-patch+json",
+        )
+        assert response.status_code == 200
+        download = client.get(f"/api/entity/{entity_id}/download")
+        assert download.json["data"]["metadata"]["owner"] == owner
+        download = client.get(f"/api/entity/{entity_id}/download?format=yaml")
+        assert yaml.safe_load(download.data)["metadata"]["owner"] == owner
+
+
+def test_export_after_delete_omits_entity(make_app, document):
+    app = make_app(STATIC_CATALOG=True)
+    client = app.test_client()
+    entity_id = client.post("/api/entity", json=document).json["entity"]["id"]
+    assert len(list(yaml.safe_load_all(client.get("/api/export").data))) == 1
+
+    assert client.delete(f"/api/entity/{entity_id}").status_code == 200
+    assert client.get(f"/api/entity/{entity_id}/download").status_code == 404
+    assert list(yaml.safe_load_all(client.get("/api/export").data)) == []
@@ -1,31 +1,54 @@
 #!/usr/bin/env python3
 
-import shutil
+import sqlite3
 from datetime import datetime
 from pathlib import Path
 from config import Config
 
+# Pages copied per backup step; progress is reported between steps
+PAGES_PER_STEP = 1024
 
-def backup_database():
-    """Create a backup of the database file"""
-    if not Config.SQLITE_DB_PATH.exists():
-        raise FileNotFoundError(f"Database file not found at {Config.SQLITE_DB_PATH}")
+
+def backup_database(db_path=None, backup_dir=None, progress=None, keep=5):
+    """Create a backup of a database file
+
+    Uses SQLite's online backup API, so the copy is consistent even while
+    the application is writing. progress, if given, is called as
+    progress(copied_pages, total_pages) between steps.
+    """
+    db_path = Path(db_path or Config.SQLITE_DB_PATH)
+    if not db_path.exists():
+        raise FileNotFoundError(f"Database file not found at {db_path}")
 
     # Create backups directory if it doesn't exist
-    backup_dir = Config.DATA_DIR / "backups"
+    backup_dir = Path(backup_dir or Config.DATA_DIR / "backups")
     backup_dir.mkdir(exist_ok=True)
 
     # Create backup filename with timestamp
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = backup_dir / f"catalog_{timestamp}.db"
+    backup_file = backup_dir / f"{db_path.stem}_{timestamp}.db"
 
-    # Copy database file
-    shutil.copy2(Config.SQLITE_DB_PATH, backup_file)
+    def report(status, remaining, total):
+        if progress is not None:
+            progress(total - remaining, total)
 
-    # Remove old backups (keep last 5)
-    backup_files = sorted(backup_dir.glob("catalog_*.db"))
-    if len(backup_files) > 5:
-        for old_backup in backup_files[:-5]:
+    # Copy database file
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(backup_file)
+    try:
+        source.backup(target, pages=PAGES_PER_STEP, progress=report)
+    except BaseException:
+        target.close()
+        backup_file.unlink(missing_ok=True)
+        raise
+    finally:
+        source.close()
+    target.close()
+
+    # Remove old backups (keep last 5 by default)
+    backup_files = sorted(backup_dir.glob(f"{db_path.stem}_*.db"))
+    if len(backup_files) > keep:
+        for old_backup in backup_files[:-keep]:
             old_backup.unlink()
 
     return backup_file
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Run in a fresh interpreter so every sample is a true cold start
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+from pathlib import Path
+from config import Config
+class BenchConfig(Config):
+    DATA_DIR = Path({data_dir!r})
+    SQLITE_DB_PATH = DATA_DIR / "catalog.db"
+    SQLALCHEMY_DATABASE_URI = f"sqlite:///{{SQLITE_DB_PATH}}"
+from app import create_app
+imported = time.perf_counter()
+create_app(BenchConfig)
+print(imported - start, time.perf_counter() - imported)
+"""
+
+
+def time_startup(data_dir: Path, runs: int) -> tuple:
+    """Return lists of import and create_app durations in seconds"""
+    script = STARTUP_SCRIPT.format(data_dir=str(data_dir))
+    imports, creates = [], []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        import_time, create_time = map(float, result.stdout.split()[-2:])
+        imports.append(import_time)
+        creates.append(create_time)
+    return imports, creates
+
+
+def import_breakdown(data_dir: Path, top: int) -> list:
+    """Return the slowest imports as (cumulative_us, self_us, module) tuples
+
+    Profiles the same script time_startup runs, so modules imported inside
+    create_app are included.
+    """
+    script = STARTUP_SCRIPT.format(data_dir=str(data_dir))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Catalog Manager startup")
+    parser.add_argument(
+        "--runs", type=int, default=5, help="Number of cold starts to time"
+    )
+    parser.add_argument(
+        "--top", type=int, default=15, help="Number of slowest imports to show"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        # The first start migrates an empty database; time it separately
+        first_imports, first_creates = time_startup(data_dir, 1)
+        imports, creates = time_startup(data_dir, args.runs)
+        slowest = import_breakdown(data_dir, args.top)
+
+    print(f"First start (empty database): create_app {first_creates[0] * 1000:.1f} ms")
+    print(f"Warm database, {args.runs} cold starts:")
+    print(f"  imports     median {statistics.median(imports) * 1000:.1f} ms")
+    print(f"  create_app  median {statistics.median(creates) * 1000:.1f} ms")
+
+    print(f"\nSlowest imports (top {args.top}):")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, module in slowest:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+
+import argparse
+import copy
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import yaml
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_MIX = "list=30,get=30,download=20,create=5,update=10,upload=5"
+
+# Statuses that mean the server deliberately turned the request away
+SHED_STATUSES = {429, 503}
+
+
+def parse_mix(mix: str) -> dict:
+    """Parse 'op=weight,...' into a dict of weights"""
+    weights = {}
+    for part in mix.split(","):
+        op, _, weight = part.partition("=")
+        if op not in OPERATIONS:
+            raise ValueError(f"Unknown operation in mix: {op}")
+        weights[op] = float(weight)
+    return weights
+
+
+def load_examples(directory: Path) -> list:
+    """Load every YAML entity document in directory"""
+    documents = []
+    for path in sorted(directory.glob("*.y*ml")):
+        with open(path) as f:
+            documents.append(yaml.safe_load(f))
+    if not documents:
+        raise ValueError(f"No YAML examples found in {directory}")
+    return documents
+
+
+class LoadClient:
+    """Issues catalog API requests and records their outcomes"""
+
+    def __init__(self, base_url: str, examples: list, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.examples = examples
+        self.timeout = timeout
+        self.entity_ids = []
+        self._ids_lock = threading.Lock()
+
+    def request(self, method: str, path: str, body=None, headers=None) -> tuple:
+        """Return (status, parsed JSON body or None)"""
+        req = urllib.request.Request(
+            self.base_url + path, data=body, method=method, headers=headers or {}
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        try:
+            return status, json.loads(payload)
+        except ValueError:
+            return status, None
+
+    def new_document(self) -> dict:
+        document = copy.deepcopy(random.choice(self.examples))
+        document["metadata"]["name"] = f"load-{uuid.uuid4().hex[:12]}"
+        return document
+
+    def random_id(self) -> int:
+        with self._ids_lock:
+            return random.choice(self.entity_ids)
+
+    def create(self) -> int:
+        body = json.dumps(self.new_document()).encode("utf-8")
+        status, payload = self.request(
+            "POST", "/api/entity", body, {"Content-Type": "application/json"}
+        )
+        if status == 201:
+            with self._ids_lock:
+                self.entity_ids.append(payload["entity"]["id"])
+        return status
+
+    def update(self) -> int:
+        patch = {"metadata": {"owner": f"team-{random.randint(0, 20)}"}}
+        status, _ = self.request(
+            "PATCH",
+            f"/api/entity/{self.random_id()}",
+            json.dumps(patch).encode("utf-8"),
+            {"Content-Type": "application/merge-patch+json"},
+        )
+        return status
+
+    def upload(self) -> int:
+        boundary = uuid.uuid4().hex
+        content = yaml.dump(self.new_document()).encode("utf-8")
+        body = (
+            (
+                f"--{boundary}\r\n"
+                'Content-Disposition: form-data; name="file"; filename="entity.yaml"\r\n'
+                "Content-Type: application/x-yaml\r\n\r\n"
+            ).encode("utf-8")
+            + content
+            + f"\r\n--{boundary}--\r\n".encode("utf-8")
+        )
+        status, _ = self.request(
+            "POST",
+            "/api/upload",
+            body,
+            {"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        )
+        return status
+
+    def list(self) -> int:
+        return self.request("GET", "/api/entity")[0]
+
+    def get(self) -> int:
+        return self.request("GET", f"/api/entity/{self.random_id()}")[0]
+
+    def download(self) -> int:
+        return self.request("GET", f"/api/entity/{self.random_id()}/download")[0]
+
+
+OPERATIONS = ("list", "get", "download", "create", "update", "upload")
+
+
+def run_load(client: LoadClient, weights: dict, concurrency: int, duration: float):
+    """Run the mix from concurrency threads; return {op: [(status, seconds)]}"""
+    ops, op_weights = list(weights), list(weights.values())
+    results = defaultdict(list)
+    results_lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        local = defaultdict(list)
+        while time.perf_counter() < deadline:
+            op = random.choices(ops, op_weights)[0]
+            start = time.perf_counter()
+            try:
+                status = getattr(client, op)()
+            except (OSError, urllib.error.URLError):
+                status = None
+            local[op].append((status, time.perf_counter() - start))
+        with results_lock:
+            for op, samples in local.items():
+                results[op].extend(samples)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    return results
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(samples: list, duration: float) -> dict:
+    latencies = sorted(seconds for _, seconds in samples)
+    errors = sum(1 for status, _ in samples if status is None or status >= 400)
+    shed = sum(1 for status, _ in samples if status in SHED_STATUSES)
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / duration, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "shed": shed,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, data_dir: Path) -> subprocess.Popen:
+    """Start run.py against a scratch data directory and wait until it answers"""
+    env = dict(os.environ, CATALOG_DATA_DIR=str(data_dir))
+    server = subprocess.Popen(
+        [sys.executable, "run.py", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BASE_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/api/entity", timeout=1)
+            return server
+        except (OSError, urllib.error.URLError):
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server did not start within 30 seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Drive the Catalog Manager HTTP API with concurrent mixed traffic"
+    )
+    parser.add_argument(
+        "--url", help="Base URL of a running server; by default one is started"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=16, help="Number of concurrent clients"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30, help="Seconds to run the load"
+    )
+    parser.add_argument(
+        "--mix", default=DEFAULT_MIX, help=f"Operation weights (default: {DEFAULT_MIX})"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=200, help="Entities to create before the run"
+    )
+    parser.add_argument(
+        "--examples",
+        type=Path,
+        default=BASE_DIR / "examples",
+        help="Directory of YAML entities to base requests on",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=30, help="Per-request timeout in seconds"
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    examples = load_examples(args.examples)
+
+    server = None
+    scratch = None
+    base_url = args.url
+    if base_url is None:
+        scratch = tempfile.TemporaryDirectory()
+        port = free_port()
+        server = start_server(port, Path(scratch.name))
+        base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        client = LoadClient(base_url, examples, args.timeout)
+        for _ in range(args.seed):
+            client.create()
+        if not client.entity_ids:
+            raise RuntimeError("Seeding failed; no entities were created")
+
+        started = time.perf_counter()
+        results = run_load(client, weights, args.concurrency, args.duration)
+        elapsed = time.perf_counter() - started
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if scratch is not None:
+            scratch.cleanup()
+
+    report = {
+        op: summarize(samples, elapsed) for op, samples in sorted(results.items())
+    }
+    report["total"] = summarize(
+        [sample for samples in results.values() for sample in samples], elapsed
+    )
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(
+        f"{args.concurrency} clients for {elapsed:.1f}s against {base_url} "
+        f"({len(client.entity_ids)} entities)"
+    )
+    header = f"{'operation':<10} {'requests':>9} {'req/s':>8} {'p50 ms':>8} "
+    print(header + f"{'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'shed':>6}")
+    for op, stats in report.items():
+        print(
+            f"{op:<10} {stats['requests']:>9} {stats['throughput_rps']:>8} "
+            f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8} "
+            f"{stats['error_rate']:>7.2%} {stats['shed']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,23 +3,38 @@
 import sqlite3
 from config import Config
 
+# Maintenance statements, run in order
+MAINTENANCE_STEPS = (
+    # Reclaim space and defragment
+    "VACUUM",
+    # Analyze tables for query optimization
+    "ANALYZE",
+    # Update SQLite statistics
+    "PRAGMA optimize",
+)
 
-def optimize_database():
-    """Perform database maintenance operations"""
-    try:
-        conn = sqlite3.connect(Config.SQLITE_DB_PATH)
-        cursor = conn.cursor()
 
-        # Perform VACUUM to reclaim space and defragment
-        cursor.execute("VACUUM")
+def run_maintenance(db_path=None, progress=None):
+    """Run the maintenance steps on a database, raising on failure
 
-        # Analyze tables for query optimization
-        cursor.execute("ANALYZE")
+    progress, if given, is called as progress(completed_steps, total_steps)
+    after each step.
+    """
+    conn = sqlite3.connect(db_path or Config.SQLITE_DB_PATH)
+    try:
+        cursor = conn.cursor()
+        for index, statement in enumerate(MAINTENANCE_STEPS, 1):
+            cursor.execute(statement)
+            if progress is not None:
+                progress(index, len(MAINTENANCE_STEPS))
+    finally:
+        conn.close()
 
-        # Update SQLite statistics
-        cursor.execute("PRAGMA optimize")
 
-        conn.close()
+def optimize_database(db_path=None):
+    """Perform database maintenance operations"""
+    try:
+        run_maintenance(db_path)
         return True
     except Exception as e:
         print(f"Error optimizing database: {e}")
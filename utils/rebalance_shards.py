@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+import argparse
+from pathlib import Path
+from sqlalchemy import create_engine, select
+from config import Config
+from app import create_app
+from app.database import db_manager
+from app.models import CatalogEntity
+from app.sharding import ShardMap
+
+
+def build_shard_map(current: ShardMap, shard_count: int, pins: list) -> ShardMap:
+    """Return the target shard map: current shards plus any added ones and pins"""
+    if shard_count < len(current.shards):
+        raise ValueError(
+            f"Cannot shrink from {len(current.shards)} to {shard_count} shards; "
+            "shards can only be added"
+        )
+    shards = current.shards + [
+        f"shard-{index:02d}" for index in range(len(current.shards), shard_count)
+    ]
+    overrides = dict(current.overrides)
+    for pin in pins:
+        namespace, _, shard = pin.partition("=")
+        if shard not in shards:
+            raise ValueError(f"Unknown shard in --move {pin}")
+        overrides[namespace] = shard
+    return ShardMap(shards, overrides)
+
+
+def plan_moves(database_files: dict, target_map: ShardMap) -> list:
+    """Return (namespace, source, target) for every namespace on the wrong shard
+
+    database_files maps each source (None for the main database) to its
+    SQLite file; the files are opened read-only and missing ones skipped.
+    """
+    moves = []
+    for source, path in database_files.items():
+        if not Path(path).exists():
+            continue
+        engine = create_engine(f"sqlite:///file:{path}?mode=ro&uri=true")
+        try:
+            with engine.connect() as conn:
+                stmt = select(CatalogEntity.namespace).distinct()
+                namespaces = conn.execute(stmt).scalars().all()
+        finally:
+            engine.dispose()
+        for namespace in namespaces:
+            target = target_map.shard_for(namespace)
+            if target != source:
+                moves.append((namespace, source, target))
+    return moves
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Add shards and move namespaces between them. "
+        "Run with the application stopped."
+    )
+    parser.add_argument(
+        "--shards", type=int, help="Total number of shards after rebalancing"
+    )
+    parser.add_argument(
+        "--move",
+        action="append",
+        default=[],
+        metavar="NAMESPACE=SHARD",
+        help="Pin a namespace to a shard (repeatable)",
+    )
+    parser.add_argument(
+        "--import-main",
+        action="store_true",
+        help="Also move entities out of the unsharded main database",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Show the moves without applying them"
+    )
+    args = parser.parse_args()
+
+    map_path = Config.SHARD_DIR / "shard_map.json"
+    shard_count = args.shards or Config.CATALOG_SHARDS or 1
+    if map_path.exists():
+        current = ShardMap.load(map_path)
+    else:
+        current = ShardMap.with_shard_count(shard_count)
+    target_map = build_shard_map(
+        current, max(shard_count, len(current.shards)), args.move
+    )
+
+    # Plan from the files as they are, so a dry run changes nothing on disk
+    database_files = {
+        shard: Config.SHARD_DIR / f"{shard}.db" for shard in current.shards
+    }
+    if args.import_main:
+        database_files = {None: Config.SQLITE_DB_PATH, **database_files}
+    moves = plan_moves(database_files, target_map)
+
+    if not args.dry_run:
+        # The app opens one engine per shard in the saved map, so save the
+        # target map first to create any new shard files
+        target_map.save(map_path)
+
+        class RebalanceConfig(Config):
+            CATALOG_SHARDS = len(target_map.shards)
+
+        create_app(RebalanceConfig)
+
+    for namespace, source, target in moves:
+        label = source or "main"
+        if args.dry_run:
+            print(f"would move {namespace}: {label} -> {target}")
+            continue
+        moved = db_manager.move_rows(
+            source, target, CatalogEntity.namespace == namespace
+        )
+        print(f"moved {namespace}: {label} -> {target} ({moved} entities)")
+
+    print(f"{len(moves)} namespace(s) {'to move' if args.dry_run else 'moved'}")
+
+
+if __name__ == "__main__":
+    main()